@@ -0,0 +1,121 @@
+"""
+Batch Export
+============
+This submodule contains tools for exporting many independent figures,
+spreading the work over a pool of worker processes::
+
+    results = export_many(factories, FakeRenderer, workers=4,
+                          result=lambda renderer: renderer.output)
+
+Each figure is built (or unpickled) and crawled in a worker process, which
+uses the Agg backend.  The outputs are returned in the order of the input,
+and an exception raised by one figure does not stop the others.
+"""
+import collections
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+from .exporter import Exporter
+
+
+ExportResult = collections.namedtuple('ExportResult', ['output', 'error'])
+ExportResult.__doc__ = """Result of the export of one figure
+
+output is the value returned by the ``result`` callable (None if the export
+failed), and error the formatted traceback of the failure (None if the
+export succeeded)."""
+
+
+def _identity(renderer):
+    return renderer
+
+
+def _init_worker(backend):
+    import matplotlib
+    matplotlib.use(backend)
+
+
+def _export_one(item, renderer_factory, result, exporter_kwargs):
+    """Build or unpickle a figure, export it, and return an ExportResult"""
+    import matplotlib.pyplot as plt
+    fig = None
+    try:
+        fig = item() if callable(item) else item
+        renderer = renderer_factory()
+        Exporter(renderer, **exporter_kwargs).run(fig)
+        return ExportResult(result(renderer), None)
+    except Exception:
+        return ExportResult(None, traceback.format_exc())
+    finally:
+        if fig is not None and (callable(item) or
+                                exporter_kwargs.get('close_mpl', True)):
+            plt.close(fig)
+
+
+def export_many(figures, renderer_factory, workers=None, result=None,
+                mp_context='spawn', backend='Agg', **kwargs):
+    """Export many figures, in parallel
+
+    Parameters
+    ----------
+    figures : iterable
+        Matplotlib figures, or callables taking no argument and returning a
+        figure.  Factories are cheaper to ship to the workers than figures,
+        which are pickled; both must be picklable (e.g. factories defined at
+        the top level of an importable module).
+    renderer_factory : callable
+        Called without arguments in the worker to create the renderer of
+        each figure, e.g. a Renderer subclass.
+    workers : int (optional)
+        Number of worker processes.  Default: the number of CPUs.  If 1 or
+        less, the figures are exported serially in this process.
+    result : callable (optional)
+        Called with the renderer after the export, in the worker; its
+        return value, which must be picklable, is the output of the figure.
+        Default: the renderer itself.
+    mp_context : string
+        The multiprocessing start method of the workers.  'spawn' (default)
+        is safe whatever backend and threads the parent process uses.
+    backend : string
+        The matplotlib backend set up in the workers.  Default: 'Agg'.
+    **kwargs :
+        Additional keyword arguments are passed to the Exporter.  Figures
+        built by factories are always closed after their export; figures
+        passed in are closed in this process when close_mpl is True (the
+        default), once all exports are done.
+
+    Returns
+    -------
+    results : list of ExportResult
+        For each figure, in order, the output and the error of the export.
+    """
+    if result is None:
+        result = _identity
+    figures = list(figures)
+
+    if workers is None or workers > 1:
+        context = multiprocessing.get_context(mp_context)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker,
+                                 initargs=(backend,)) as executor:
+            futures = [executor.submit(_export_one, item, renderer_factory,
+                                       result, kwargs)
+                       for item in figures]
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception:
+                    # e.g. unpicklable figures or outputs, or a worker crash
+                    results.append(ExportResult(None,
+                                                traceback.format_exc()))
+        if kwargs.get('close_mpl', True):
+            import matplotlib.pyplot as plt
+            for item in figures:
+                if not callable(item):
+                    plt.close(item)
+    else:
+        results = [_export_one(item, renderer_factory, result, kwargs)
+                   for item in figures]
+    return results
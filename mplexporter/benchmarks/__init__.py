@@ -0,0 +1,14 @@
+"""
+Exporter Benchmarks
+===================
+This submodule contains timing benchmarks for the exporter.  They are not
+run as part of the test suite; run them from the command line, e.g.::
+
+    python -m mplexporter.benchmarks run -o results.json
+    python -m mplexporter.benchmarks compare old.json results.json
+    python -m mplexporter.benchmarks.predraw
+    python -m mplexporter.benchmarks.cache
+    python -m mplexporter.benchmarks.axes_workers
+"""
+from .figures import FIGURES
+from .suite import run_benchmarks, compare
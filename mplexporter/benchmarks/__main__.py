@@ -0,0 +1,61 @@
+"""
+Command-line interface of the benchmark suite::
+
+    python -m mplexporter.benchmarks run -o results.json --scale 0.1
+    python -m mplexporter.benchmarks compare old.json new.json
+"""
+import argparse
+import sys
+
+import matplotlib
+matplotlib.use('Agg')
+
+from . import suite
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m mplexporter.benchmarks")
+    subparsers = parser.add_subparsers(dest='command')
+
+    run = subparsers.add_parser('run', help="run the benchmark suite")
+    run.add_argument('-o', '--output', help="JSON file to write results to")
+    run.add_argument('--scale', type=float, default=1.0,
+                     help="multiplier of the amount of data in the figures")
+    run.add_argument('--repeat', type=int, default=3)
+    run.add_argument('--figure', action='append', dest='figures',
+                     choices=sorted(suite.FIGURES))
+    run.add_argument('--renderer', action='append', dest='renderers',
+                     choices=sorted(suite.RENDERERS))
+
+    cmp = subparsers.add_parser('compare', help="compare two result files")
+    cmp.add_argument('old')
+    cmp.add_argument('new')
+    cmp.add_argument('--stage', default='total',
+                     help="one of {0}, or a profiled stage, e.g. draw_line"
+                     .format(", ".join(suite.STAGES)))
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'compare':
+        rows = suite.compare(suite.load(args.old), suite.load(args.new),
+                             stage=args.stage)
+        for row in rows:
+            print("{0:>14s} {1:>16s} {2:10.4f} {3:10.4f} {4:8.2f}x"
+                  .format(*row))
+    elif args.command == 'run':
+        print("{0:>14s} {1:>16s} {2:>10s} {3:>10s} {4:>10s}".format(
+            "figure", "renderer", *suite.STAGES))
+        results = suite.run_benchmarks(figures=args.figures,
+                                       renderers=args.renderers,
+                                       scale=args.scale, repeat=args.repeat,
+                                       verbose=True)
+        if args.output:
+            suite.save(results, args.output)
+    else:
+        parser.print_help()
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
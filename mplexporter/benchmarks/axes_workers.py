@@ -0,0 +1,65 @@
+"""
+Benchmark of parallel axes crawling
+===================================
+Compare the time of the crawl of a figure of many axes with
+``Exporter(axes_workers=n)`` for a few numbers of threads, with the serial
+crawl (``axes_workers=None``).  The threads only help where the extraction
+releases the GIL, i.e. in the NumPy and matplotlib transforms of large
+arrays; the figure is built so that this work dominates.
+"""
+import argparse
+import timeit
+
+import numpy as np
+import matplotlib
+import matplotlib.pyplot as plt
+
+from ..exporter import Exporter
+from ..renderers import FullFakeRenderer
+
+
+def make_figure(npoints=200000, nsubplots=8):
+    """Build a figure of subplots holding long lines and scatter plots"""
+    rng = np.random.RandomState(0)
+    fig, axes = plt.subplots(nsubplots // 2, 2, figsize=(8, nsubplots))
+    for i, ax in enumerate(axes.flat):
+        x = np.linspace(0, 10, npoints)
+        ax.plot(x, np.sin(x + i))
+        ax.scatter(rng.rand(npoints // 10), rng.rand(npoints // 10))
+        ax.fill_between(x, np.sin(x + i), np.sin(x + i) + 1)
+    return fig
+
+
+def time_crawl(axes_workers, repeat=5, **kwargs):
+    """Return the best time (in seconds) of the crawl of the figure"""
+    fig = make_figure(**kwargs)
+    exporter = Exporter(FullFakeRenderer(), close_mpl=False,
+                        axes_workers=axes_workers)
+    exporter.draw_layout(fig)
+    times = timeit.repeat(lambda: exporter.crawl_fig(fig),
+                          number=1, repeat=repeat)
+    plt.close(fig)
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m mplexporter.benchmarks.axes_workers")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--npoints', type=int, default=200000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, 8])
+    args = parser.parse_args(argv)
+
+    serial = time_crawl(None, args.repeat, npoints=args.npoints)
+    print("{0:>8s} {1:>10s} {2:>8s}".format("workers", "crawl (s)",
+                                            "speedup"))
+    print("{0:>8s} {1:10.4f} {2:8.2f}".format("serial", serial, 1))
+    for workers in args.workers:
+        elapsed = time_crawl(workers, args.repeat, npoints=args.npoints)
+        print("{0:>8d} {1:10.4f} {2:8.2f}".format(workers, elapsed,
+                                                  serial / elapsed))
+
+
+if __name__ == '__main__':
+    matplotlib.use('Agg')
+    main()
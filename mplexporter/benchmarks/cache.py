@@ -0,0 +1,60 @@
+"""
+Benchmark of the export cache
+=============================
+Compare the cost of fingerprinting a figure, which is paid on every export
+with ``Exporter(cache=...)``, with the cost of a full export and of a
+cache hit, for each of the benchmark figures::
+
+    python -m mplexporter.benchmarks.cache --scale 0.1
+"""
+import argparse
+import timeit
+
+import matplotlib
+import matplotlib.pyplot as plt
+
+from ..cache import ExportCache, fingerprint
+from ..exporter import Exporter
+from ..renderers import FakeRenderer
+from .figures import FIGURES
+
+
+def time_cache(figure_factory, scale=1.0, repeat=3):
+    """Return the best times (in seconds) of a fingerprint, of a full
+    export, and of an export which hits the cache"""
+    fig = figure_factory(scale)
+    fingerprint_time = min(timeit.repeat(lambda: fingerprint(fig),
+                                         number=1, repeat=repeat))
+
+    def export(cache=None):
+        fig = figure_factory(scale)
+        exporter = Exporter(FakeRenderer(), cache=cache)
+        start = timeit.default_timer()
+        exporter.run(fig)
+        return timeit.default_timer() - start
+
+    export_time = min(export() for i in range(repeat))
+    cache = ExportCache()
+    export(cache)
+    hit_time = min(export(cache) for i in range(repeat))
+    plt.close('all')
+    return fingerprint_time, export_time, hit_time
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m mplexporter.benchmarks.cache")
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print("{0:>14s} {1:>14s} {2:>12s} {3:>12s}".format(
+        "figure", "fingerprint (s)", "export (s)", "hit (s)"))
+    for name in sorted(FIGURES):
+        times = time_cache(FIGURES[name], args.scale, args.repeat)
+        print("{0:>14s} {1:14.4f} {2:12.4f} {3:12.4f}".format(name, *times))
+
+
+if __name__ == '__main__':
+    matplotlib.use('Agg')
+    main()
@@ -0,0 +1,109 @@
+"""
+Synthetic Benchmark Figures
+===========================
+Factories for the figures used by the benchmark suite.  Each factory takes a
+``scale`` argument which multiplies the amount of data in the figure, so
+that the same suite can be run quickly (``scale=0.1``) or at production
+sizes (``scale=1`` and above).
+"""
+import datetime
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+
+def _size(n, scale):
+    return max(int(n * scale), 2)
+
+
+def large_lines(scale=1.0):
+    """A few long line plots"""
+    n = _size(250000, scale)
+    x = np.linspace(0, 100, n)
+    fig, ax = plt.subplots()
+    for i in range(4):
+        ax.plot(x, np.sin(x + i) + 0.1 * np.cos(50 * x))
+    return fig
+
+
+def scatter(scale=1.0):
+    """A scatter plot with per-point sizes and colors"""
+    n = _size(100000, scale)
+    rng = np.random.RandomState(0)
+    fig, ax = plt.subplots()
+    ax.scatter(rng.randn(n), rng.randn(n), s=20 * rng.rand(n),
+               c=rng.rand(n), alpha=0.5)
+    return fig
+
+
+def fill_between(scale=1.0):
+    """A fill_between polygon with many vertices"""
+    n = _size(100000, scale)
+    x = np.linspace(0, 100, n)
+    fig, ax = plt.subplots()
+    ax.fill_between(x, np.sin(x), np.sin(x) + 1 + 0.1 * np.cos(30 * x))
+    return fig
+
+
+def contourf(scale=1.0):
+    """Filled contours of a noisy surface"""
+    n = _size(300, np.sqrt(scale))
+    x, y = np.meshgrid(np.linspace(-3, 3, n), np.linspace(-3, 3, n))
+    z = np.sin(3 * x) * np.cos(3 * y) + 0.1 * np.sin(20 * x * y)
+    fig, ax = plt.subplots()
+    ax.contourf(x, y, z, levels=20)
+    return fig
+
+
+def imshow(scale=1.0):
+    """A single large image"""
+    n = _size(500, np.sqrt(scale))
+    rng = np.random.RandomState(0)
+    fig, ax = plt.subplots()
+    ax.imshow(rng.rand(n, n), interpolation='nearest')
+    return fig
+
+
+def many_subplots(scale=1.0):
+    """A 10x10 grid of small line plots with titles"""
+    n = _size(1000, scale)
+    x = np.linspace(0, 10, n)
+    fig, axes = plt.subplots(10, 10, figsize=(20, 20))
+    for i, ax in enumerate(axes.flat):
+        ax.plot(x, np.sin(x + i))
+        ax.set_title("subplot {0}".format(i))
+    return fig
+
+
+def dense_legend(scale=1.0):
+    """Many labelled lines with markers, and a legend"""
+    n = _size(100, scale)
+    x = np.linspace(0, 10, n)
+    fig, ax = plt.subplots()
+    for i in range(40):
+        ax.plot(x, np.sin(x + 0.1 * i) + i, 'o-', markersize=3,
+                label="line {0}".format(i))
+    ax.legend(ncol=4, fontsize=6)
+    return fig
+
+
+def date_axes(scale=1.0):
+    """A time series plotted against datetimes"""
+    n = _size(50000, scale)
+    start = datetime.datetime(2020, 1, 1)
+    dates = [start + datetime.timedelta(minutes=i) for i in range(n)]
+    rng = np.random.RandomState(0)
+    fig, ax = plt.subplots()
+    ax.plot(dates, np.cumsum(rng.randn(n)))
+    fig.autofmt_xdate()
+    return fig
+
+
+FIGURES = {'large_lines': large_lines,
+           'scatter': scatter,
+           'fill_between': fill_between,
+           'contourf': contourf,
+           'imshow': imshow,
+           'many_subplots': many_subplots,
+           'dense_legend': dense_legend,
+           'date_axes': date_axes}
@@ -0,0 +1,60 @@
+"""
+Benchmark of the pre-crawl layout pass
+======================================
+Compare the cost of ``Exporter(predraw="png")``, which renders a throwaway
+PNG before crawling the figure, with the default ``predraw="layout"``.
+"""
+import timeit
+
+import numpy as np
+import matplotlib
+import matplotlib.pyplot as plt
+
+from ..exporter import Exporter
+from ..renderers import FakeRenderer
+
+
+def make_figure(npoints=10000, nsubplots=4):
+    """Build a moderately busy figure with lines, scatter, text & legends"""
+    rng = np.random.RandomState(0)
+    fig, axes = plt.subplots(nsubplots, figsize=(8, 2 * nsubplots))
+    for i, ax in enumerate(np.atleast_1d(axes)):
+        x = np.linspace(0, 10, npoints)
+        ax.plot(x, np.sin(x + i), label='sin')
+        ax.scatter(rng.rand(npoints // 10), rng.rand(npoints // 10),
+                   label='scatter')
+        ax.set_title("subplot {0}".format(i))
+        ax.legend()
+    return fig
+
+
+def time_predraw(predraw, repeat=5, **kwargs):
+    """Return the best time (in seconds) of a full export"""
+    def export():
+        fig = make_figure(**kwargs)
+        Exporter(FakeRenderer(), predraw=predraw).run(fig)
+    return min(timeit.repeat(export, number=1, repeat=repeat))
+
+
+def time_layout_only(predraw, repeat=5, **kwargs):
+    """Return the best time (in seconds) of the layout pass alone"""
+    fig = make_figure(**kwargs)
+    exporter = Exporter(FakeRenderer(), predraw=predraw)
+    times = timeit.repeat(lambda: exporter.draw_layout(fig),
+                          number=1, repeat=repeat)
+    plt.close(fig)
+    return min(times)
+
+
+def main(repeat=5):
+    print("{0:>8s} {1:>12s} {2:>12s}".format("predraw", "layout (s)",
+                                             "export (s)"))
+    for predraw in ["png", "layout"]:
+        print("{0:>8s} {1:12.4f} {2:12.4f}".format(
+            predraw, time_layout_only(predraw, repeat),
+            time_predraw(predraw, repeat)))
+
+
+if __name__ == '__main__':
+    matplotlib.use('Agg')
+    main()
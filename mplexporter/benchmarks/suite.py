@@ -0,0 +1,244 @@
+"""
+Exporter Benchmark Suite
+========================
+Time the stages of an export (the layout pass and the crawl of the figure)
+for every combination of synthetic figure and renderer, profile the stages
+of one more export with ExportProfiler, and store the results as JSON so
+that runs on different commits can be compared.
+"""
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import warnings
+
+import numpy as np
+import matplotlib
+import matplotlib.pyplot as plt
+
+from ..exporter import Exporter
+from ..profiling import ExportProfiler
+from ..renderers import FakeRenderer, FullFakeRenderer, VegaRenderer
+from .figures import FIGURES
+
+
+RENDERERS = {'FakeRenderer': FakeRenderer,
+             'FullFakeRenderer': FullFakeRenderer,
+             'VegaRenderer': VegaRenderer}
+
+STAGES = ['layout', 'crawl', 'total']
+
+# The combinations of figure and renderer which cannot be exported, with
+# the reason; they are recorded as such instead of being run.
+UNSUPPORTED = {('scatter', 'VegaRenderer'):
+               "VegaRenderer does not implement draw_path"}
+
+
+def time_export(figure_factory, renderer_class, scale=1.0, repeat=3):
+    """Time the stages of the export of a figure
+
+    A new figure is built for every repetition; building it is not timed.
+
+    Returns
+    -------
+    times : dict
+        For every stage in STAGES, the list of times in seconds.
+    """
+    times = dict((stage, []) for stage in STAGES)
+    for i in range(repeat):
+        fig = figure_factory(scale)
+        exporter = Exporter(renderer_class(), close_mpl=False)
+        try:
+            t0 = time.perf_counter()
+            exporter.transform_cache.clear()
+            exporter.draw_layout(fig)
+            t1 = time.perf_counter()
+            exporter.crawl_fig(fig)
+            t2 = time.perf_counter()
+        finally:
+            plt.close(fig)
+        times['layout'].append(t1 - t0)
+        times['crawl'].append(t2 - t1)
+        times['total'].append(t2 - t0)
+    return times
+
+
+def profile_export(figure_factory, renderer_class, scale=1.0):
+    """Profile the export of a figure
+
+    Returns
+    -------
+    stages : dict
+        For every stage recorded by ExportProfiler (e.g. "layout",
+        "draw_line" or "renderer.draw_path"), its 'calls', 'time' and
+        'self_time' in seconds.
+    """
+    fig = figure_factory(scale)
+    profiler = ExportProfiler()
+    try:
+        Exporter(renderer_class(), close_mpl=False, profiler=profiler).run(fig)
+    finally:
+        plt.close(fig)
+    return dict((name, {'calls': stats['calls'], 'time': stats['time'],
+                        'self_time': stats['self_time']})
+                for name, stats in profiler.report()['stages'].items())
+
+
+def summarize(times):
+    """Summary statistics of a list of times"""
+    return {'best': min(times),
+            'median': float(np.median(times)),
+            'times': list(times)}
+
+
+def git_commit():
+    """Return the commit of the mplexporter checkout, or None"""
+    try:
+        output = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.STDOUT,
+            cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode('ascii').strip()
+
+
+def metadata():
+    """Describe the environment the benchmarks are run in"""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return {'timestamp': now.isoformat(),
+            'commit': git_commit(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'numpy': np.__version__,
+            'matplotlib': matplotlib.__version__}
+
+
+def run_benchmarks(figures=None, renderers=None, scale=1.0, repeat=3,
+                   verbose=False):
+    """Run the benchmark suite
+
+    Parameters
+    ----------
+    figures : list of strings (optional)
+        Names of the figures in FIGURES to benchmark.  Default: all.
+    renderers : list of strings (optional)
+        Names of the renderers in RENDERERS to benchmark.  Default: all.
+    scale : float
+        Multiplier of the amount of data in the figures.
+    repeat : int
+        Number of exports timed for each figure and renderer.
+    verbose : bool
+        If True, print the best total time of each benchmark as it runs.
+
+    Returns
+    -------
+    results : dict
+        A JSON-serializable dictionary with 'metadata' and 'results' keys.
+        Each result has the summary of the times of STAGES in 'stages',
+        and the profile of one export in 'profile' (see profile_export).
+        The combinations in UNSUPPORTED are not run, and are recorded with
+        their reason in 'unsupported'.  Exports which raise an exception
+        are recorded with their error message.
+    """
+    results = []
+    for figure_name in figures or sorted(FIGURES):
+        for renderer_name in renderers or sorted(RENDERERS):
+            result = {'figure': figure_name,
+                      'renderer': renderer_name,
+                      'scale': scale,
+                      'repeat': repeat,
+                      'stages': None,
+                      'profile': None,
+                      'unsupported': UNSUPPORTED.get((figure_name,
+                                                      renderer_name)),
+                      'error': None}
+            if result['unsupported'] is None:
+                _run_benchmark(result, scale, repeat)
+            results.append(result)
+            if verbose:
+                print(format_result(result))
+                sys.stdout.flush()
+    return {'metadata': metadata(), 'results': results}
+
+
+def _run_benchmark(result, scale, repeat):
+    """Time and profile the export of a result's figure and renderer"""
+    figure_factory = FIGURES[result['figure']]
+    renderer_class = RENDERERS[result['renderer']]
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            times = time_export(figure_factory, renderer_class,
+                                scale=scale, repeat=repeat)
+            profile = profile_export(figure_factory, renderer_class,
+                                     scale=scale)
+    except Exception as err:
+        result['error'] = type(err).__name__
+        if str(err):
+            result['error'] += ": {0}".format(err)
+    else:
+        result['stages'] = dict((stage, summarize(times[stage]))
+                                for stage in STAGES)
+        result['profile'] = profile
+
+
+def format_result(result):
+    """One-line text summary of a benchmark result"""
+    name = "{0[figure]:>14s} {0[renderer]:>16s}".format(result)
+    if result.get('unsupported') is not None:
+        return "{0}  unsupported: {1}".format(name, result['unsupported'])
+    if result['error'] is not None:
+        return "{0}  error: {1}".format(name, result['error'])
+    return "{0} {1:10.4f} {2:10.4f} {3:10.4f}".format(
+        name, *[result['stages'][stage]['best'] for stage in STAGES])
+
+
+def save(results, filename):
+    """Write benchmark results to a JSON file"""
+    with open(filename, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load(filename):
+    """Read benchmark results from a JSON file"""
+    with open(filename) as f:
+        return json.load(f)
+
+
+def compare(old, new, stage='total'):
+    """Compare the best times of two benchmark runs
+
+    The stage is one of STAGES, compared by best time, or a stage of the
+    profiles (e.g. "draw_line"), compared by total time.
+
+    Returns
+    -------
+    rows : list of tuples
+        (figure, renderer, old time, new time, new / old) for every
+        benchmark which succeeded in both runs, and has the stage.
+    """
+    old_times = dict(((r['figure'], r['renderer']), _stage_time(r, stage))
+                     for r in old['results'])
+    rows = []
+    for r in new['results']:
+        key = (r['figure'], r['renderer'])
+        new_time = _stage_time(r, stage)
+        if new_time is not None and old_times.get(key):
+            rows.append(key + (old_times[key], new_time,
+                               new_time / old_times[key]))
+    return rows
+
+
+def _stage_time(result, stage):
+    """The time of a stage in a result, or None"""
+    if result['error'] is not None or result['stages'] is None:
+        return None
+    if stage in STAGES:
+        return result['stages'][stage]['best']
+    stats = (result.get('profile') or {}).get(stage)
+    return None if stats is None else stats['time']
@@ -0,0 +1,407 @@
+"""
+Export Cache
+============
+This submodule contains a cache of exports, keyed by a fingerprint of what
+the Exporter reads from a figure: the data arrays, styles, limits, ticks
+and texts of its artists.  Pass a cache to the exporter::
+
+    cache = ExportCache(maxbytes=256 * 2 ** 20, directory="/tmp/exports")
+    Exporter(renderer, cache=cache).run(fig)
+
+On a miss the renderer calls of the export are recorded and stored; on a
+hit they are replayed onto the renderer without crawling the figure, with
+the artists passed to the renderer (``mplobj``) mapped to the
+corresponding artists of the figure being exported.
+
+The fingerprint only covers what the exporter exports, so it misses
+changes to properties the exporter ignores, which is the point.  It is
+computed without drawing the figure.  See ``python -m
+mplexporter.benchmarks.cache`` for its cost compared to a full export.
+"""
+import collections
+import hashlib
+import os
+import pickle
+import tempfile
+
+import numpy as np
+import matplotlib
+
+from . import utils
+from .events import Event
+from .exporter import decompose_transform
+
+
+def iter_export_objects(fig):
+    """Iterate over the figure, axes, legends and artists of a figure
+
+    The objects are those passed to the renderer by the Exporter, in the
+    order of the Exporter.  Each item is a tuple (object, axes) where axes
+    is None for the figure and its texts.
+    """
+    yield fig, None
+    suptitle = getattr(fig, "_suptitle", None)
+    if suptitle is not None:
+        yield suptitle, None
+    for text in fig.texts:
+        if text is not suptitle:
+            yield text, None
+    for ax in fig.axes:
+        yield ax, ax
+        for artist in ax.lines:
+            yield artist, ax
+        for artist in ax.texts:
+            yield artist, ax
+        for artist in [ax.xaxis.label, ax.yaxis.label, ax.title]:
+            yield artist, ax
+        for artist in ax.artists:
+            yield artist, ax
+        for artist in ax.patches:
+            yield artist, ax
+        for artist in ax.collections:
+            yield artist, ax
+        for artist in ax.images:
+            yield artist, ax
+        legend = ax.get_legend()
+        if legend is not None:
+            yield legend, ax
+            for child in utils.iter_all_children(legend._legend_box,
+                                                 skipContainers=True):
+                yield child, ax
+            yield legend.legendPatch, ax
+
+
+def _feed(h, value):
+    """Update the hash with a (nested) value"""
+    if isinstance(value, (type(None), bool, int, float, str)):
+        h.update(repr(value).encode('utf-8'))
+    elif isinstance(value, np.ndarray):
+        if isinstance(value, np.ma.MaskedArray):
+            _feed(h, np.ma.getmaskarray(value))
+            value = value.data
+        if value.dtype == object:
+            _feed(h, value.tolist())
+        else:
+            h.update("{0}{1}".format(value.dtype.str,
+                                     value.shape).encode('ascii'))
+            h.update(np.ascontiguousarray(value).data)
+    elif isinstance(value, np.generic):
+        _feed(h, value.item())
+    elif isinstance(value, dict):
+        h.update(b'{')
+        for key in sorted(value, key=str):
+            _feed(h, key)
+            _feed(h, value[key])
+        h.update(b'}')
+    elif isinstance(value, (list, tuple)):
+        h.update(b'[')
+        for item in value:
+            _feed(h, item)
+        h.update(b']')
+    elif isinstance(value, matplotlib.transforms.Transform):
+        _feed(h, type(value).__name__)
+        if value.is_affine:
+            _feed(h, value.get_matrix())
+    else:
+        # Only the type of other objects: their repr may contain their id.
+        _feed(h, type(value).__name__)
+        text = repr(value)
+        if ' at 0x' not in text:
+            h.update(text.encode('utf-8'))
+
+
+def _transform_key(transform, ax, fig):
+    """The coordinates and remaining transform the exporter would use"""
+    return decompose_transform(transform, ax, fig)[1:]
+
+
+def _colormap_state(mappable):
+    """The colormap and normalization of a ScalarMappable
+
+    Colormaps and norms of different contents may have the same names (e.g.
+    "from_list"), so that their lookup table and full state are used.
+    """
+    cmap = mappable.get_cmap()
+    lut = cmap(np.linspace(0, 1, cmap.N))
+    return {'lut': lut,
+            'extremes': (cmap.get_under(), cmap.get_over(), cmap.get_bad()),
+            'norm': (type(mappable.norm).__name__,
+                     _object_state(mappable.norm))}
+
+
+# The attributes of norms, scales and transforms which are not part of their
+# state: links to other objects and caches.
+_IGNORED_STATE = ('callbacks', '_parents', '_invalid')
+
+
+def _object_state(obj):
+    """The attributes of an object, those of its scales and transforms
+    included"""
+    state = {}
+    for key, value in vars(obj).items():
+        if key in _IGNORED_STATE:
+            continue
+        if isinstance(value, (matplotlib.scale.ScaleBase,
+                              matplotlib.transforms.Transform)):
+            value = (type(value).__name__, _object_state(value))
+        state[key] = value
+    return state
+
+
+def _artist_properties(obj, ax, fig):
+    """The properties of an object which are exported"""
+    props = _exported_properties(obj, ax, fig)
+    if props is not None:
+        # e.g. with the rasterize option
+        props['rasterized'] = obj.get_rasterized()
+    return props
+
+
+def _exported_properties(obj, ax, fig):
+    Artist = matplotlib.artist.Artist
+    if isinstance(obj, matplotlib.figure.Figure):
+        return utils.get_figure_properties(obj)
+    elif isinstance(obj, matplotlib.axes.Axes):
+        return utils.get_axes_properties(obj)
+    elif isinstance(obj, matplotlib.legend.Legend):
+        return {'labels': [text.get_text() for text in obj.get_texts()],
+                'visible': obj.get_visible()}
+    elif isinstance(obj, matplotlib.lines.Line2D):
+        return {'data': obj.get_xydata(),
+                'transform': _transform_key(obj.get_transform(), ax, fig),
+                'line': utils.get_line_style(obj),
+                'marker': utils.get_marker_style(obj),
+                'label': obj.get_label()}
+    elif isinstance(obj, matplotlib.text.Text):
+        return {'text': obj.get_text(),
+                'position': obj.get_position(),
+                'transform': _transform_key(obj.get_transform(), ax, fig),
+                'style': (utils.get_text_style(obj)
+                          if obj.get_text() else None)}
+    elif isinstance(obj, matplotlib.patches.Patch):
+        path = obj.get_path()
+        return {'path': (path.vertices, path.codes),
+                'transform': _transform_key(obj.get_transform(), ax, fig),
+                'style': utils.get_path_style(obj, fill=obj.get_fill())}
+    elif isinstance(obj, matplotlib.collections.Collection):
+        return {'paths': [(path.vertices, path.codes)
+                          for path in obj.get_paths()],
+                'offsets': obj.get_offsets(),
+                'transform': _transform_key(obj.get_transform(), ax, fig),
+                'offset_transform': _transform_key(
+                    obj.get_offset_transform(), ax, fig),
+                'path_transforms': obj.get_transforms(),
+                'linewidth': obj.get_linewidths(),
+                'facecolor': obj.get_facecolors(),
+                'edgecolor': obj.get_edgecolors(),
+                'linestyle': obj.get_linestyles(),
+                'alpha': obj.get_alpha(),
+                'zorder': obj.get_zorder(),
+                # the colors of colormapped collections are only updated
+                # when they are drawn: hash what they are computed from
+                'array': obj.get_array(),
+                'colormap': _colormap_state(obj)}
+    elif isinstance(obj, matplotlib.image.AxesImage):
+        return {'array': obj.get_array(),
+                'colormap': _colormap_state(obj),
+                'extent': obj.get_extent(),
+                'interpolation': obj.get_interpolation(),
+                'origin': obj.origin,
+                'alpha': obj.get_alpha(),
+                'zorder': obj.get_zorder()}
+    elif isinstance(obj, Artist):
+        return {'zorder': obj.get_zorder(), 'visible': obj.get_visible()}
+    return None
+
+
+def digest(value):
+    """Return a hex digest of a nested value of arrays, lists, dicts, ..."""
+    h = hashlib.blake2b(digest_size=20)
+    _feed(h, value)
+    return h.hexdigest()
+
+
+def artist_digest(obj, ax, fig):
+    """Return a hex digest of what the Exporter reads from one object
+
+    The digest of a legend covers its elements.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    _feed(h, type(obj).__name__)
+    _feed(h, _artist_properties(obj, ax, fig))
+    if isinstance(obj, matplotlib.legend.Legend):
+        children = list(utils.iter_all_children(obj._legend_box,
+                                                skipContainers=True))
+        for child in children + [obj.legendPatch]:
+            _feed(h, type(child).__name__)
+            _feed(h, _artist_properties(child, ax, fig))
+    return h.hexdigest()
+
+
+def fingerprint(fig):
+    """Return a hex digest of what the Exporter reads from the figure"""
+    h = hashlib.blake2b(digest_size=20)
+    for obj, ax in iter_export_objects(fig):
+        _feed(h, type(obj).__name__)
+        _feed(h, _artist_properties(obj, ax, fig))
+    return h.hexdigest()
+
+
+class _ObjectRef(collections.namedtuple('_ObjectRef', ['index'])):
+    """Reference to an object by its index in iter_export_objects"""
+
+
+def _map_objects(value, function):
+    """Apply function to the artists and references nested in value"""
+    if isinstance(value, (matplotlib.artist.Artist, _ObjectRef)):
+        return function(value)
+    elif isinstance(value, dict):
+        return dict((key, _map_objects(item, function))
+                    for key, item in value.items())
+    elif isinstance(value, list):
+        return [_map_objects(item, function) for item in value]
+    elif isinstance(value, tuple) and type(value) is tuple:
+        return tuple(_map_objects(item, function) for item in value)
+    return value
+
+
+def pack_events(events, fig):
+    """Replace the figure objects in events by references to their index
+
+    Returns None if an event refers to an unknown matplotlib object.
+    """
+    index = dict((id(obj), i) for i, (obj, ax)
+                 in enumerate(iter_export_objects(fig)))
+
+    def pack(obj):
+        return _ObjectRef(index[id(obj)])
+
+    try:
+        return [Event(event.kind, event.method,
+                      _map_objects(event.kwargs, pack))
+                for event in events]
+    except KeyError:
+        return None
+
+
+def unpack_events(events, fig):
+    """Replace the references of packed events by the objects of fig"""
+    objects = [obj for (obj, ax) in iter_export_objects(fig)]
+
+    def unpack(ref):
+        return objects[ref.index]
+
+    return [Event(event.kind, event.method,
+                  _map_objects(event.kwargs, unpack))
+            for event in events]
+
+
+class ExportCache(object):
+    """An LRU cache of the renderer calls of exports
+
+    Entries are stored pickled.  The least recently used entries are
+    evicted from memory when the total size of the entries exceeds
+    maxbytes.
+
+    Parameters
+    ----------
+    maxbytes : int
+        The maximum size of the entries kept in memory.  Default: 64 MB.
+    directory : string (optional)
+        If given, entries are also written to files in this directory,
+        and read from them on a miss in memory.
+
+    Notes
+    -----
+    Entries read from the directory are unpickled, and unpickling data can
+    execute arbitrary code: only use a directory which nobody but trusted
+    users can write to, not e.g. a shared temporary directory.
+    """
+    def __init__(self, maxbytes=64 * 2 ** 20, directory=None):
+        self.maxbytes = maxbytes
+        self.directory = directory
+        if directory is not None and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._entries = collections.OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries or (self.directory is not None and
+                                        os.path.exists(self._path(key)))
+
+    def clear(self):
+        """Remove all entries from memory (the directory is kept)"""
+        self._entries.clear()
+        self.nbytes = 0
+
+    def key(self, fig, *options):
+        """The key of the export of fig with the given export options"""
+        h = hashlib.blake2b(digest_size=20)
+        _feed(h, fingerprint(fig))
+        _feed(h, list(options))
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".pickle")
+
+    def _remember(self, key, data):
+        if key in self._entries:
+            self.nbytes -= len(self._entries.pop(key))
+        if len(data) > self.maxbytes:
+            return
+        self._entries[key] = data
+        self.nbytes += len(data)
+        while self.nbytes > self.maxbytes:
+            old_key, old_data = self._entries.popitem(last=False)
+            self.nbytes -= len(old_data)
+
+    def get(self, key):
+        """Return the stored bytes of key, or None"""
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+        elif self.directory is not None and os.path.exists(self._path(key)):
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+            self._remember(key, data)
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """Store bytes under key"""
+        self._remember(key, data)
+        if self.directory is not None:
+            fd, tmp = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, self._path(key))
+
+    def load_events(self, key, fig):
+        """Return the events stored for key, for the figure fig, or None"""
+        data = self.get(key)
+        if data is None:
+            return None
+        return unpack_events(pickle.loads(data), fig)
+
+    def store_events(self, key, events, fig):
+        """Store the events of the export of fig under key
+
+        Returns False if the events cannot be stored.
+        """
+        packed = pack_events(events, fig)
+        if packed is None:
+            return False
+        try:
+            data = pickle.dumps(packed, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return False
+        self.put(key, data)
+        return True
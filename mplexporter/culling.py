@@ -0,0 +1,111 @@
+"""
+View Culling
+============
+This submodule contains tools for dropping the parts of the data of an axes
+which fall outside of its view limits.  All tests are done in display
+(pixel) coordinates, against the bounding box of the axes, which is the
+image of the view limits (``ax.get_xlim()``, ``ax.get_ylim()``) by the data
+transform, so that culling works for any scale or projection.  The
+functions return indices or masks, so that the exporter can select the
+data in any coordinates.
+"""
+import numpy as np
+
+
+def view_box(ax, margin=0.05):
+    """The display box (x0, y0, x1, y1) of the view of an axes
+
+    The box is expanded on all sides by margin times its width and height.
+    """
+    x0, y0, x1, y1 = ax.bbox.extents
+    dx, dy = margin * (x1 - x0), margin * (y1 - y0)
+    return (x0 - dx, y0 - dy, x1 + dx, y1 + dy)
+
+
+def points_in_box(points, box, pad=0):
+    """Mask of the (N, 2) points lying within pad pixels of the box"""
+    x0, y0, x1, y1 = box
+    x, y = points[:, 0], points[:, 1]
+    return ((x >= x0 - pad) & (x <= x1 + pad) &
+            (y >= y0 - pad) & (y <= y1 + pad))
+
+
+def extents_in_box(extents, box):
+    """Mask of the (N, 4) extents (x0, y0, x1, y1) overlapping the box"""
+    x0, y0, x1, y1 = box
+    return ((extents[:, 2] >= x0) & (extents[:, 0] <= x1) &
+            (extents[:, 3] >= y0) & (extents[:, 1] <= y1))
+
+
+def cull_line(display, box, connected=True, pad=0):
+    """Select the points of a line which can be seen in the box
+
+    Parameters
+    ----------
+    display : ndarray
+        The (N, 2) points of the line, in display coordinates.
+    box : tuple
+        The (x0, y0, x1, y1) view box, in display coordinates.
+    connected : bool
+        If True, the points are joined by segments: the two points of every
+        segment whose bounding box overlaps the box are kept, so that the
+        segments crossing the boundary of the view are drawn, and the
+        indices of separate runs of kept points are separated by -1 (a
+        break of the line).  If False, only the points in the box are kept.
+    pad : float
+        The distance in pixels by which the box is expanded, e.g. half of
+        the size of the markers of the points.  Default: 0.
+
+    Returns
+    -------
+    indices : ndarray or None
+        The indices of the points to keep, with -1 marking breaks, or None
+        if all the points are kept.
+    """
+    x0, y0, x1, y1 = box
+    box = (x0 - pad, y0 - pad, x1 + pad, y1 + pad)
+    if not connected or len(display) < 2:
+        keep = points_in_box(display, box)
+        if keep.all():
+            return None
+        return np.flatnonzero(keep)
+
+    start, end = display[:-1], display[1:]
+    extents = np.column_stack([np.minimum(start, end),
+                               np.maximum(start, end)])
+    visible = extents_in_box(extents, box)
+    keep = np.zeros(len(display), dtype=bool)
+    keep[:-1] |= visible
+    keep[1:] |= visible
+    if keep.all():
+        return None
+
+    indices = np.flatnonzero(keep)
+    # Non-finite points are never kept, so every gap needs a break.
+    gaps = np.flatnonzero(np.diff(indices) > 1)
+    return np.insert(indices, gaps + 1, -1)
+
+
+def take(data, indices):
+    """Select rows of data, filling the rows of indices -1 with NaN"""
+    data = np.asarray(data, dtype=float)[indices]
+    data[indices < 0] = np.nan
+    return data
+
+
+def collection_pad(path, transform, path_transforms):
+    """Bound the display distance between a path and its offset
+
+    The bound is in pixels, for the path drawn through any of the
+    path_transforms followed by the transform.  Returns None if the
+    transform is not affine, as the distance is then not bounded.
+    """
+    if not transform.is_affine:
+        return None
+    radius = np.abs(path.vertices).max() if len(path.vertices) else 0
+    if len(path_transforms):
+        linear = np.abs(np.asarray(path_transforms)[:, :2, :2])
+        radius = radius * linear.sum(axis=-1).max()
+    matrix = transform.get_matrix()
+    return (np.abs(matrix[:2, :2]).sum(axis=-1).max() * radius +
+            np.abs(matrix[:2, 2]).max())
@@ -0,0 +1,142 @@
+"""
+Line Decimation
+===============
+This submodule contains algorithms reducing the number of points of a line
+to what can be seen at the resolution of the figure.  The algorithms work
+on display (pixel) coordinates, and return the indices of the points to
+keep, so that the exporter can select them from the data in any
+coordinates.
+
+Both algorithms assume that x increases (or decreases) monotonically along
+each run of finite points, as for time series: :func:`decimate` does not
+decimate lines for which this does not hold.  Runs of finite points are
+decimated independently, and one non-finite point is kept between runs so
+that the gaps of the line are preserved.
+"""
+import numpy as np
+
+
+METHODS = ['minmax', 'lttb']
+
+
+def minmax_indices(x, y, n_bins):
+    """Indices of the first, last, minimum and maximum points of each bin
+
+    The points are split into n_bins bins of equal width in x; x must be
+    sorted.  Drawn at a resolution of one bin per pixel column, the
+    decimated line is indistinguishable from the full line.
+    """
+    span = x[-1] - x[0]
+    if span == 0:
+        bins = np.zeros(len(x), dtype=int)
+    else:
+        bins = np.minimum(((x - x[0]) * (n_bins / span)).astype(int),
+                          n_bins - 1)
+    starts = np.flatnonzero(np.diff(bins, prepend=-1))
+    ends = np.append(starts[1:], len(x)) - 1
+    counts = np.diff(np.append(starts, len(x)))
+    bin_ids = np.repeat(np.arange(len(starts)), counts)
+
+    keep = [starts, ends]
+    for reduce in (np.minimum, np.maximum):
+        extremes = reduce.reduceat(y, starts)
+        matches = np.flatnonzero(y == extremes[bin_ids])
+        # first match of each bin
+        first = np.flatnonzero(np.diff(bin_ids[matches], prepend=-1))
+        keep.append(matches[first])
+    return np.unique(np.concatenate(keep))
+
+
+def lttb_indices(x, y, n_out):
+    """Indices of the points selected by Largest-Triangle-Three-Buckets
+
+    The first and last points are kept, and the others are split into
+    n_out - 2 buckets, from each of which the point forming the largest
+    triangle with the point selected in the previous bucket and the mean of
+    the next bucket is kept.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = (1 + np.arange(n_out - 1) * ((n - 2) / (n_out - 2))).astype(int)
+    edges[-1] = n - 1
+
+    indices = np.empty(n_out, dtype=int)
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_stop = edges[i + 2]
+            mean_x = x[stop:next_stop].mean()
+            mean_y = y[stop:next_stop].mean()
+        else:
+            mean_x, mean_y = x[-1], y[-1]
+        area = np.abs((x[a] - mean_x) * (y[start:stop] - y[a])
+                      - (x[a] - x[start:stop]) * (mean_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def decimate(display, width, method='minmax'):
+    """Select the points of a line to keep at the resolution of the figure
+
+    Parameters
+    ----------
+    display : ndarray
+        The (N, 2) array of the points of the line, in display coordinates.
+    width : float
+        The width of the figure in pixels; each run of finite points is
+        reduced to at most one bin per pixel column.
+    method : string
+        "minmax" keeps the extremes of each pixel column (up to four points
+        per column).  "lttb" keeps two points per column with the
+        Largest-Triangle-Three-Buckets algorithm.
+
+    Returns
+    -------
+    indices : ndarray or None
+        The sorted indices of the points to keep, or None if the line is not
+        decimated because it is short enough or x is not monotonic.
+    """
+    if method not in METHODS:
+        raise ValueError("decimation method must be one of {0}, not {1!r}"
+                         .format(METHODS, method))
+    n_points = len(display)
+    width = max(int(np.ceil(width)), 1)
+    if n_points <= 2 * width:
+        return None
+
+    x, y = display[:, 0], display[:, 1]
+    finite = np.isfinite(x) & np.isfinite(y)
+    dx = np.diff(x[finite])
+    if not (np.all(dx >= 0) or np.all(dx <= 0)):
+        return None
+
+    # Split into runs of finite points.
+    changes = np.flatnonzero(np.diff(finite.astype(np.int8))) + 1
+    bounds = np.concatenate([[0], changes, [n_points]])
+    keep = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        if not finite[start]:
+            keep.append(np.array([start]))
+            continue
+        run_x, run_y = x[start:stop], y[start:stop]
+        if run_x[0] > run_x[-1]:
+            run_x = -run_x
+        span = run_x[-1] - run_x[0]
+        n_bins = int(min(max(np.ceil(span), 1), width))
+        if method == 'minmax':
+            if stop - start > 4 * n_bins:
+                keep.append(start + minmax_indices(run_x, run_y, n_bins))
+                continue
+        elif stop - start > 2 * n_bins:
+            keep.append(start + lttb_indices(run_x, run_y, 2 * n_bins))
+            continue
+        keep.append(np.arange(start, stop))
+    indices = np.concatenate(keep)
+    if len(indices) == n_points:
+        return None
+    return indices
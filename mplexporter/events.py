@@ -0,0 +1,121 @@
+"""
+Renderer Events
+===============
+This submodule contains tools for recording the calls made by the Exporter
+to a renderer, and replaying them later onto another renderer.  Recording
+decouples the extraction of the data of a figure from its rendering: the
+extraction can run e.g. in worker threads, while the renderer only ever
+sees the calls of the replay, in order, from a single thread.
+"""
+import collections
+import warnings
+from contextlib import contextmanager
+
+
+class Event(collections.namedtuple('Event', ['kind', 'method', 'kwargs'])):
+    """A call made by the exporter to a renderer
+
+    kind is "enter" or "exit" for the draw_figure, draw_axes and draw_legend
+    context managers, and "call" for the drawing methods.  method is the
+    name of the renderer method, and kwargs the dictionary of its arguments
+    (empty for "exit" events).
+    """
+    __slots__ = ()
+
+    @property
+    def name(self):
+        """The type of the event: the name of the Renderer method called
+
+        e.g. "open_figure" and "close_figure" for the draw_figure context,
+        or "draw_path_collection".
+        """
+        if self.kind == "enter":
+            return "open_" + self.method[len("draw_"):]
+        elif self.kind == "exit":
+            return "close_" + self.method[len("draw_"):]
+        return self.method
+
+
+# Renderer context managers used by the exporter.
+CONTEXT_METHODS = ['draw_figure', 'draw_axes', 'draw_legend']
+
+# Renderer drawing methods called by the exporter.
+DRAW_METHODS = ['draw_marked_line', 'draw_text', 'draw_figure_text',
+                'draw_path', 'draw_path_collection',
+                'draw_packed_path_collection', 'draw_image']
+
+
+class RecordingRenderer(object):
+    """Record the renderer calls of an export as a list of Events
+
+    Attributes which are not renderer methods (e.g. the capability flag
+    ``packed_path_collection``) are looked up on the target renderer, so
+    that the exporter makes the same calls as it would to the target.
+
+    Parameters
+    ----------
+    target : Renderer object (optional)
+        The renderer the events are meant to be replayed onto.
+    sink : callable (optional)
+        If given, events are passed to this callable instead of being
+        appended to the ``events`` list.
+    """
+    def __init__(self, target=None, sink=None):
+        self.target = target
+        self.events = []
+        self._emit = self.events.append if sink is None else sink
+
+    def __getattr__(self, name):
+        if name in ('target', '_emit'):
+            raise AttributeError(name)
+        if name in CONTEXT_METHODS:
+            return self._context(name)
+        if name in DRAW_METHODS:
+            return self._recorder(name)
+        if self.target is None:
+            raise AttributeError(name)
+        return getattr(self.target, name)
+
+    def _recorder(self, method):
+        def record(**kwargs):
+            self._emit(Event("call", method, kwargs))
+        return record
+
+    def _context(self, method):
+        @contextmanager
+        def record(**kwargs):
+            self._emit(Event("enter", method, kwargs))
+            yield
+            self._emit(Event("exit", method, {}))
+        return record
+
+
+def replay(events, renderer):
+    """Make the renderer calls recorded as events
+
+    Drawing calls made within a legend which raise NotImplementedError are
+    skipped with a warning, as the exporter does for the legend elements.
+    """
+    stack = []
+    for event in events:
+        if event.kind == "enter":
+            context = getattr(renderer, event.method)(**event.kwargs)
+            context.__enter__()
+            stack.append((event.method, context))
+        elif event.kind == "exit":
+            method, context = stack.pop()
+            if method != event.method:
+                raise ValueError("unbalanced events: {0} closed by {1}"
+                                 .format(method, event.method))
+            context.__exit__(None, None, None)
+        elif stack and stack[-1][0] == 'draw_legend':
+            try:
+                getattr(renderer, event.method)(**event.kwargs)
+            except NotImplementedError:
+                warnings.warn("Legend element %s not implemented"
+                              % event.kwargs.get('mplobj'))
+        else:
+            getattr(renderer, event.method)(**event.kwargs)
+    if stack:
+        raise ValueError("unbalanced events: {0} is not closed"
+                         .format(stack[-1][0]))
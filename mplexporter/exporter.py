@@ -6,13 +6,42 @@ relevant pieces to a renderer.
 """
 import warnings
 import io
+import itertools
+import copy
+import functools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 import numpy as np
 from . import utils
+from . import culling
+from . import quantization
+from .decimation import decimate, METHODS as DECIMATION_METHODS
+from .events import RecordingRenderer, replay
+from .serialize import Coordinates, TypedArray
 
 import matplotlib
 from matplotlib import transforms, collections, path as mpath
 from matplotlib.backends.backend_agg import FigureCanvasAgg
 
+def _profiled(stage, artist_arg=1):
+    """Decorate an Exporter method to time it when a profiler is set.
+
+    artist_arg is the index of the positional argument holding the artist
+    processed by the method."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.profiler is None:
+                return method(self, *args, **kwargs)
+            artist = args[artist_arg] if len(args) > artist_arg else None
+            with self.profiler.stage(stage, artist):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
 class Exporter(object):
     """Matplotlib Exporter
 
@@ -26,11 +55,127 @@ class Exporter(object):
         If True (default), close the matplotlib figure as it is rendered. This
         is useful for when the exporter is used within the notebook, or with
         an interactive matplotlib backend.
+    predraw : string
+        How the figure is drawn before crawling, so that tick locators, text
+        positions, legends and transforms are resolved.  "layout" (default)
+        runs matplotlib's draw logic without producing any pixels.  "png"
+        renders the figure to a throwaway PNG, which was the behavior of
+        earlier versions.
+    profiler : ExportProfiler (optional)
+        If given, record the time, call counts, vertex counts and bytes of
+        every stage of the export.  See mplexporter.profiling.
+    axes_workers : int (optional)
+        If given, extract the data of the axes of the figure in a pool of
+        this many threads.  The renderer calls made for each axes are
+        recorded and replayed in the original order, from the calling
+        thread, so renderers need not be thread-safe.  The threads only
+        read the figure: the axes properties (whose tick labels update the
+        tickers of shared axes) are computed before, and legends and
+        rasterized artists, whose export modifies or draws the figure, are
+        exported from the calling thread once the threads are done.  With
+        a profiler, only the axes properties, the renderer calls and the
+        main-thread elements are timed for the axes.  See
+        ``python -m mplexporter.benchmarks.axes_workers``.
+    decimate : string (optional)
+        If given, reduce the points of long lines without markers to what
+        can be seen at the pixel width of the figure, with the "minmax" or
+        "lttb" algorithm (see mplexporter.decimation).  The style of a
+        decimated line has a "decimated_from" entry giving its original
+        number of points.
+    cull : bool
+        If True, drop the parts of lines, patches and collections of the
+        axes which are outside of the view limits (see mplexporter.culling).
+        Lines crossing the boundary of the view are kept up to their first
+        point outside of it, and broken by NaN points where parts of them
+        were dropped.  Default: False.
+    cull_margin : float
+        The fraction of the width and height of the view by which it is
+        expanded on all sides before culling.  Default: 0.05.
+    simplify : bool
+        If True, simplify the unfilled paths of patches and collections in
+        display space, with matplotlib's path simplification and the
+        tolerance of the ``path.simplify_threshold`` rcParam (in pixels),
+        for the paths matplotlib would simplify (see Path.should_simplify).
+        As with matplotlib's Agg backend, filled paths are not simplified,
+        since it would distort their fill; neither are artists with path
+        effects, and rasterized artists.  The number of vertices
+        before and after simplification is counted in the
+        ``simplify_stats`` attribute.  Default: False.
+    rasterize : bool
+        If True, the lines, patches and collections of the axes which are
+        marked as rasterized (see Artist.set_rasterized) are rendered with
+        Agg, cropped to the axes, and passed to renderer.draw_image instead
+        of being exported as vectors.  Default: False.
+    raster_threshold : int (optional)
+        If given, also rasterize the lines, patches and collections of more
+        than this number of vertices (for collections, offsets plus path
+        vertices).
+    cache : ExportCache (optional)
+        If given, look up the renderer calls of the export of the figure in
+        this cache, keyed by a fingerprint of the figure and the exporter
+        options, and replay them instead of crawling the figure.  Exports
+        missing from the cache are recorded and stored.  See
+        mplexporter.cache.
+    array_encoding : string (optional)
+        If given ("float32" or "float64"), pass the line data, patch and
+        collection vertices and collection offsets of at least
+        array_threshold values to the renderer as serialize.TypedArrays
+        of this dtype, which mplexporter.serialize encodes as binary
+        buffers instead of lists of numbers.  TypedArrays are arrays, so
+        renderers which do not serialize them work unchanged.  The other
+        arrays of coordinates are passed as serialize.Coordinates, which
+        the ``delta`` option of serialize may encode as differences.
+    array_threshold : int
+        The minimum number of values of an array passed as a TypedArray.
+        Default: 1024.
+    precision : int, string or dict (optional)
+        If given, round the coordinates passed to the renderer (line data,
+        vertices, offsets and text positions), to encode them to shorter
+        text.  The policy is either a number of significant digits, or
+        "pixel" to round the coordinates to the largest decimal step which
+        moves them by at most half of pixel_tolerance pixels in the
+        figure.  A dict maps coordinate codes ("data", "axes", "figure",
+        "display") to policies, coordinates without a policy not being
+        rounded; a single policy applies to all codes.  See
+        mplexporter.quantization.
+    pixel_tolerance : float
+        The tolerance of the "pixel" precision policy, in pixels.
+        Default: 0.1.
     """
 
-    def __init__(self, renderer, close_mpl=True):
+    def __init__(self, renderer, close_mpl=True, predraw="layout",
+                 profiler=None, axes_workers=None, decimate=None,
+                 cull=False, cull_margin=0.05, simplify=False,
+                 rasterize=False, raster_threshold=None, cache=None,
+                 array_encoding=None, array_threshold=1024, precision=None,
+                 pixel_tolerance=0.1):
+        if predraw not in ("layout", "png"):
+            raise ValueError("predraw must be 'layout' or 'png', "
+                             "not {0!r}".format(predraw))
+        if decimate is not None and decimate not in DECIMATION_METHODS:
+            raise ValueError("decimate must be one of {0}, not {1!r}"
+                             .format(DECIMATION_METHODS, decimate))
+        if array_encoding not in (None, "float32", "float64"):
+            raise ValueError("array_encoding must be None, 'float32' or "
+                             "'float64', not {0!r}".format(array_encoding))
         self.close_mpl = close_mpl
         self.renderer = renderer
+        self.predraw = predraw
+        self.profiler = profiler
+        self.axes_workers = axes_workers
+        self.decimate = decimate
+        self.cull = cull
+        self.cull_margin = cull_margin
+        self.simplify = simplify
+        self.rasterize = rasterize
+        self.raster_threshold = raster_threshold
+        self.cache = cache
+        self.array_encoding = array_encoding
+        self.array_threshold = array_threshold
+        self.precision = _precision_policy(precision)
+        self.pixel_tolerance = pixel_tolerance
+        self.simplify_stats = _new_simplify_stats()
+        self.transform_cache = TransformCache()
 
     def run(self, fig):
         """
@@ -41,19 +186,166 @@ class Exporter(object):
         fig : matplotlib.Figure instance
             The figure to export
         """
-        # Calling savefig executes the draw() command, putting elements
-        # in the correct place.
-        if fig.canvas is None:
-            canvas = FigureCanvasAgg(fig)
-        fig.savefig(io.BytesIO(), format='png', dpi=fig.dpi)
+        run = self._run if self.cache is None else self._run_cached
+        if self.profiler is None:
+            run(fig)
+        else:
+            with self.profiler.profile(self.renderer):
+                run(fig)
+
+    def _run(self, fig):
+        self._prepare(fig)
+        with self._stage("crawl"):
+            self.crawl_fig(fig)
+
+    def _prepare(self, fig):
+        """Reset the state of the export and lay out the figure"""
+        self.transform_cache.clear()
+        self.simplify_stats = _new_simplify_stats()
+        with self._stage("layout"):
+            self.draw_layout(fig)
         if self.close_mpl:
             import matplotlib.pyplot as plt
             plt.close(fig)
-        self.crawl_fig(fig)
+
+    def iter_events(self, fig, maxsize=256):
+        """
+        Export the figure as a stream of renderer calls
+
+        The figure is laid out (and closed, with close_mpl) in the calling
+        thread when the iteration starts.  It is then crawled in a
+        background thread as the events are consumed, so that the output of
+        large figures can be produced (e.g. written to a file or socket)
+        while they are being processed.  The figure must not be modified
+        until the iteration is done.
+
+        Parameters
+        ----------
+        fig : matplotlib.Figure instance
+            The figure to export
+        maxsize : int
+            The maximum number of events crawled ahead of the consumer.
+
+        Yields
+        ------
+        event : mplexporter.events.Event
+            The renderer calls, in order: see Event.name for their type.
+            Renderer.consume(events) makes the calls.  The renderer of the
+            exporter is only used for its capabilities, such as
+            ``packed_path_collection``; it is not called.
+        """
+        events = queue.Queue(maxsize)
+        stopped = threading.Event()
+        done = object()
+
+        def put(item):
+            while True:
+                if stopped.is_set():
+                    raise _StreamClosed()
+                try:
+                    events.put(item, timeout=0.05)
+                    return
+                except queue.Full:
+                    pass
+
+        exporter = copy.copy(self)
+        exporter.renderer = RecordingRenderer(self.renderer, sink=put)
+        exporter.transform_cache = TransformCache()
+        exporter.profiler = None
+        exporter.cache = None
+        # pyplot and the layout pass must stay in the calling thread
+        exporter._prepare(fig)
+
+        def produce():
+            try:
+                try:
+                    exporter.crawl_fig(fig)
+                except _StreamClosed:
+                    raise
+                except BaseException as err:
+                    put(_StreamError(err))
+                else:
+                    put(done)
+            except _StreamClosed:
+                pass
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            while True:
+                event = events.get()
+                if event is done:
+                    break
+                elif isinstance(event, _StreamError):
+                    raise event.error
+                yield event
+        finally:
+            stopped.set()
+            producer.join()
+
+    def _run_cached(self, fig):
+        with self._stage("fingerprint"):
+            key = self.cache.key(fig, *self._cache_options())
+        events = self.cache.load_events(key, fig)
+        if events is None:
+            renderer = self.renderer
+            self.renderer = RecordingRenderer(renderer)
+            try:
+                self._run(fig)
+                events = self.renderer.events
+            finally:
+                self.renderer = renderer
+            self.cache.store_events(key, events, fig)
+        elif self.close_mpl:
+            import matplotlib.pyplot as plt
+            plt.close(fig)
+        with self._stage("replay"):
+            replay(events, self.renderer)
+
+    def _cache_options(self):
+        """The options which the calls made to the renderer depend on"""
+        renderer = type(self.renderer)
+        options = [renderer.__module__ + "." + renderer.__name__,
+                   getattr(self.renderer, "packed_path_collection", False),
+                   self.predraw, self.decimate, self.cull, self.cull_margin,
+                   self.simplify, self.rasterize, self.raster_threshold,
+                   self.array_encoding, self.array_threshold,
+                   self.precision, self.pixel_tolerance]
+        if self.simplify:
+            options += [matplotlib.rcParams['path.simplify'],
+                        matplotlib.rcParams['path.simplify_threshold']]
+        return options
+
+    def _stage(self, name, artist=None):
+        """Context manager timing a stage of the export, if profiling"""
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.stage(name, artist)
+
+    def draw_layout(self, fig):
+        """Execute the figure's draw() logic, putting elements in the
+        correct place, according to the ``predraw`` setting."""
+        if fig.canvas is None:
+            canvas = FigureCanvasAgg(fig)
+        if self.predraw == "png":
+            fig.savefig(io.BytesIO(), format='png', dpi=fig.dpi)
+        elif hasattr(fig, "draw_without_rendering"):
+            # matplotlib 3.6+
+            fig.draw_without_rendering()
+        else:
+            canvas = fig.canvas
+            if not hasattr(canvas, "get_renderer"):
+                canvas = FigureCanvasAgg(fig)
+            renderer = canvas.get_renderer()
+            if hasattr(renderer, "_draw_disabled"):
+                with renderer._draw_disabled():
+                    fig.draw(renderer)
+            else:
+                fig.draw(renderer)
 
     @staticmethod
     def process_transform(transform, ax=None, fig=None, data=None,
-                          return_trans=False, force_trans=None):
+                          return_trans=False, force_trans=None, cache=None):
         """Process the transform and convert data to figure or data coordinates
 
         Parameters
@@ -70,6 +362,9 @@ class Exporter(object):
             If true, return the final transform of the data
         force_trans : matplotlib.transform instance (optional)
             If supplied, first force the data to this transform
+        cache : TransformCache instance (optional)
+            If supplied, look up (and store) the decomposition of the
+            transform in this cache.
 
         Returns
         -------
@@ -87,27 +382,15 @@ class Exporter(object):
             warnings.warn("Blended transforms not yet supported. "
                           "Zoom behavior may not work as expected.")
 
-        if force_trans is not None:
-            if data is not None:
-                data = (transform - force_trans).transform(data)
-            transform = force_trans
+        if cache is not None:
+            pre_trans, code, transform = cache.get(transform, ax, fig,
+                                                   force_trans)
+        else:
+            pre_trans, code, transform = decompose_transform(transform, ax,
+                                                             fig, force_trans)
 
-        code = "display"
-        fig_ref = ax.figure if ax is not None else fig
-        if ax is not None:
-            for (c, trans) in [("data", ax.transData),
-                               ("axes", ax.transAxes),
-                               ("figure", ax.figure.transFigure),
-                               ("display", transforms.IdentityTransform())]:
-                if transform.contains_branch(trans):
-                    code, transform = (c, transform - trans)
-                    break
-        elif fig_ref is not None:
-            for (c, trans) in [("figure", fig_ref.transFigure),
-                               ("display", transforms.IdentityTransform())]:
-                if transform.contains_branch(trans):
-                    code, transform = (c, transform - trans)
-                    break
+        if data is not None and pre_trans is not None:
+            data = pre_trans.transform(data)
 
         if data is not None:
             if return_trans:
@@ -122,62 +405,155 @@ class Exporter(object):
 
     def crawl_fig(self, fig):
         """Crawl the figure and process all axes"""
-        with self.renderer.draw_figure(fig=fig,
-                                       props=utils.get_figure_properties(fig)):
-            if getattr(fig, "_suptitle", None) is not None:
-                self.draw_figure_text(fig, fig._suptitle, text_type="suptitle")
-            for text in fig.texts:
-                if text is not getattr(fig, "_suptitle", None):
-                    self.draw_figure_text(fig, text)
+        with self._stage("figure_properties"):
+            props = utils.get_figure_properties(fig)
+        with self.renderer.draw_figure(fig=fig, props=props):
+            for text, draw in self._iter_fig_texts(fig):
+                draw()
 
-            for ax in fig.axes:
-                self.crawl_ax(ax)
+            if self.axes_workers and len(fig.axes) > 1:
+                self._crawl_axes_parallel(fig.axes)
+            else:
+                for ax in fig.axes:
+                    self.crawl_ax(ax)
+
+    def _main_thread_element(self, artist):
+        """Whether exporting the element modifies or draws the figure, so
+        that it must not run in a worker thread: legends, whose elements
+        are reordered, and rasterized artists, which are drawn with Agg."""
+        return (isinstance(artist, matplotlib.legend.Legend)
+                or self._rasterizes(artist))
 
+    def _record_ax(self, ax):
+        """Extract the data of the elements of the axes with a recording
+        renderer
+
+        Returns the list of the recorded events of each element (None for
+        the elements to export from the main thread), and the
+        simplification statistics.
+        """
+        exporter = copy.copy(self)
+        exporter.renderer = RecordingRenderer(self.renderer)
+        exporter.transform_cache = TransformCache()
+        exporter.profiler = None
+        exporter.simplify_stats = _new_simplify_stats()
+        events = exporter.renderer.events
+        elements = []
+        for artist, draw in exporter._iter_ax_elements(ax):
+            if self._main_thread_element(artist):
+                elements.append(None)
+            else:
+                start = len(events)
+                draw()
+                elements.append(events[start:])
+        return elements, exporter.simplify_stats
+
+    def _crawl_axes_parallel(self, axes):
+        """Extract the data of the axes in a thread pool, then make the
+        renderer calls in order from the calling thread
+
+        Only read-only extraction runs in the threads: the axes properties,
+        whose tick labels update the tickers shared by shared axes, are
+        computed before, and the elements which modify or draw the figure
+        are exported once all threads are done.
+        """
+        axes_props = []
+        for ax in axes:
+            with self._stage("axes_properties"):
+                axes_props.append(utils.get_axes_properties(ax))
+        with ThreadPoolExecutor(max_workers=self.axes_workers) as executor:
+            results = list(executor.map(self._record_ax, axes))
+        for ax, props, (elements, stats) in zip(axes, axes_props, results):
+            with self.renderer.draw_axes(ax=ax, props=props):
+                for (artist, draw), events in zip(self._iter_ax_elements(ax),
+                                                  elements):
+                    if events is None:
+                        draw()
+                    else:
+                        replay(events, self.renderer)
+            for key, value in stats.items():
+                self.simplify_stats[key] += value
+
+    @_profiled("crawl_ax", artist_arg=0)
     def crawl_ax(self, ax):
         """Crawl the axes and process all elements within"""
-        with self.renderer.draw_axes(ax=ax,
-                                     props=utils.get_axes_properties(ax)):
-            for line in ax.lines:
-                self.draw_line(ax, line)
-            for text in ax.texts:
-                self.draw_text(ax, text)
-            for (text, ttp) in zip([ax.xaxis.label, ax.yaxis.label, ax.title],
-                                   ["xlabel", "ylabel", "title"]):
-                if(hasattr(text, 'get_text') and text.get_text()):
-                    self.draw_text(ax, text, force_trans=ax.transAxes,
-                                   text_type=ttp)
-            for artist in ax.artists:
-                # TODO: process other artists
-                if isinstance(artist, matplotlib.text.Text):
-                    self.draw_text(ax, artist)
-            for patch in ax.patches:
-                self.draw_patch(ax, patch)
-            for collection in ax.collections:
-                self.draw_collection(ax, collection)
-            for image in ax.images:
-                self.draw_image(ax, image)
-
-            legend = ax.get_legend()
-            if legend is not None:
-                props = utils.get_legend_properties(ax, legend)
-                with self.renderer.draw_legend(legend=legend, props=props):
-                    if props['visible']:
-                        self.crawl_legend(ax, legend)
+        with self._stage("axes_properties"):
+            props = utils.get_axes_properties(ax)
+        with self.renderer.draw_axes(ax=ax, props=props):
+            for artist, draw in self._iter_ax_elements(ax):
+                draw()
+
+    def _iter_fig_texts(self, fig):
+        """Iterate over the texts of the figure, in the order of crawl_fig
+
+        Yields (text, draw) pairs, as _iter_ax_elements.
+        """
+        suptitle = getattr(fig, "_suptitle", None)
+        if suptitle is not None:
+            yield suptitle, functools.partial(self.draw_figure_text, fig,
+                                              suptitle, text_type="suptitle")
+        for text in fig.texts:
+            if text is not suptitle:
+                yield text, functools.partial(self.draw_figure_text, fig,
+                                              text)
 
+    def _iter_ax_elements(self, ax):
+        """Iterate over the elements of the axes, in the order of crawl_ax
+
+        Yields (artist, draw) pairs, where draw is a callable exporting the
+        artist to the renderer.  The legend is a single element.
+        """
+        for line in ax.lines:
+            yield line, functools.partial(self.draw_line, ax, line)
+        for text in ax.texts:
+            yield text, functools.partial(self.draw_text, ax, text)
+        for (text, ttp) in zip([ax.xaxis.label, ax.yaxis.label, ax.title],
+                               ["xlabel", "ylabel", "title"]):
+            if hasattr(text, 'get_text'):
+                yield text, functools.partial(self.draw_text, ax, text,
+                                              force_trans=ax.transAxes,
+                                              text_type=ttp)
+        for artist in ax.artists:
+            # TODO: process other artists
+            if isinstance(artist, matplotlib.text.Text):
+                yield artist, functools.partial(self.draw_text, ax, artist)
+        for patch in ax.patches:
+            yield patch, functools.partial(self.draw_patch, ax, patch)
+        for collection in ax.collections:
+            yield collection, functools.partial(self.draw_collection, ax,
+                                                collection)
+        for image in ax.images:
+            yield image, functools.partial(self.draw_image, ax, image)
+
+        legend = ax.get_legend()
+        if legend is not None:
+            yield legend, functools.partial(self.draw_legend, ax, legend)
+
+    def draw_legend(self, ax, legend):
+        """Process a matplotlib legend and its elements"""
+        with self._stage("legend_properties"):
+            props = utils.get_legend_properties(ax, legend)
+        with self.renderer.draw_legend(legend=legend, props=props):
+            if props['visible']:
+                self.crawl_legend(ax, legend)
+
+    @_profiled("draw_figure_text")
     def draw_figure_text(self, fig, text, text_type=None):
         """Process a figure-level matplotlib text object"""
         content = text.get_text()
         if content:
             transform = text.get_transform()
             position = text.get_position()
-            coords, position = self.process_transform(transform, None, fig,
-                                                      position)
+            coords, position = self.process_transform(
+                transform, None, fig, position, cache=self.transform_cache)
+            position = self._quantize(coords, position, fig=fig)
             style = utils.get_text_style(text)
             self.renderer.draw_figure_text(text=content, position=position,
                                            coordinates=coords,
                                            text_type=text_type,
                                            style=style, mplobj=text)
 
+    @_profiled("crawl_legend")
     def crawl_legend(self, ax, legend):
         """
         Recursively look through objects in legend children
@@ -186,8 +562,11 @@ class Exporter(object):
                                                       skipContainers=True))
         legendElements.append(legend.legendPatch)
         for child in legendElements:
-            # force a large zorder so it appears on top
-            child.set_zorder(1E6 + child.get_zorder())
+            # force a large zorder so it appears on top, while the child is
+            # exported; it is restored afterwards so that exporting the
+            # figure again gives the same result.
+            zorder = child.get_zorder()
+            child.set_zorder(1E6 + zorder)
 
             # reorder border box to make sure marks are visible
             if isinstance(child, matplotlib.patches.FancyBboxPatch):
@@ -209,13 +588,19 @@ class Exporter(object):
                     warnings.warn("Legend element %s not implemented" % child)
             except NotImplementedError:
                 warnings.warn("Legend element %s not implemented" % child)
+            finally:
+                child.set_zorder(zorder)
 
+    @_profiled("draw_line")
     def draw_line(self, ax, line, force_trans=None):
         """Process a matplotlib line and call renderer.draw_line"""
+        if force_trans is None and self._draw_as_raster(ax, line):
+            return
         coordinates, data = self.process_transform(line.get_transform(),
                                                    ax=ax,
                                                    data=line.get_xydata(),
-                                                   force_trans=force_trans)
+                                                   force_trans=force_trans,
+                                                   cache=self.transform_cache)
         linestyle = utils.get_line_style(line)
         if (linestyle['dasharray'] is None
                 and linestyle['drawstyle'] == 'default'):
@@ -224,63 +609,131 @@ class Exporter(object):
         if (markerstyle['marker'] in ['None', 'none', None]
                 or markerstyle['markerpath'][0].size == 0):
             markerstyle = None
+        display = None
+        if self.cull and force_trans is None and (markerstyle or linestyle):
+            with self._stage("cull"):
+                display = line.get_transform().transform(line.get_xydata())
+                pad = 0
+                if markerstyle:
+                    # markers centered out of the view may overlap it
+                    pad = (0.5 * (line.get_markersize() +
+                                  line.get_markeredgewidth())
+                           * ax.figure.dpi / 72.)
+                indices = culling.cull_line(
+                    display, culling.view_box(ax, self.cull_margin),
+                    connected=linestyle is not None, pad=pad)
+                if indices is not None:
+                    if not len(indices):
+                        return
+                    data = culling.take(data, indices)
+                    display = culling.take(display, indices)
+        if (self.decimate and linestyle is not None and markerstyle is None
+                and force_trans is None):
+            with self._stage("decimate"):
+                data, linestyle = self._decimate_line(ax, line, data,
+                                                      linestyle, display)
         label = line.get_label()
         if markerstyle or linestyle:
+            data = self._coords(self._quantize(coordinates, data, ax))
             self.renderer.draw_marked_line(data=data, coordinates=coordinates,
                                            linestyle=linestyle,
                                            markerstyle=markerstyle,
                                            label=label,
                                            mplobj=line)
 
+    def _decimate_line(self, ax, line, data, linestyle, display=None):
+        """Decimate the line data if it has more points than can be seen"""
+        if linestyle['drawstyle'] != 'default' or len(data) < 3:
+            return data, linestyle
+        props = utils.get_figure_properties(ax.figure)
+        width = props['figwidth'] * props['dpi']
+        if display is None:
+            display = line.get_transform().transform(line.get_xydata())
+        indices = decimate(display, width, method=self.decimate)
+        if indices is not None:
+            linestyle = dict(linestyle, decimated_from=len(data))
+            data = data[indices]
+        return data, linestyle
+
+    @_profiled("draw_text")
     def draw_text(self, ax, text, force_trans=None, text_type=None):
         """Process a matplotlib text object and call renderer.draw_text"""
         content = text.get_text()
         if content:
             transform = text.get_transform()
             position = text.get_position()
-            coords, position = self.process_transform(transform,
-                                                      ax=ax,
-                                                      data=position,
-                                                      force_trans=force_trans)
+            coords, position = self.process_transform(
+                transform, ax=ax, data=position, force_trans=force_trans,
+                cache=self.transform_cache)
+            position = self._quantize(coords, position, ax)
             style = utils.get_text_style(text)
             self.renderer.draw_text(text=content, position=position,
                                     coordinates=coords,
                                     text_type=text_type,
                                     style=style, mplobj=text)
 
+    @_profiled("draw_patch")
     def draw_patch(self, ax, patch, force_trans=None):
         """Process a matplotlib patch object and call renderer.draw_path"""
-        vertices, pathcodes = utils.SVG_path(patch.get_path())
+        if force_trans is None and self._draw_as_raster(ax, patch):
+            return
+        if self.cull and force_trans is None:
+            extents = np.array([patch.get_window_extent().extents])
+            box = culling.view_box(ax, self.cull_margin)
+            if not culling.extents_in_box(extents, box)[0]:
+                return
         transform = patch.get_transform()
-        coordinates, vertices = self.process_transform(transform,
-                                                       ax=ax,
-                                                       data=vertices,
-                                                       force_trans=force_trans)
+        vertices, pathcodes = self._svg_path(patch, patch.get_path(),
+                                             transform)
+        coordinates, vertices = self.process_transform(
+            transform, ax=ax, data=vertices, force_trans=force_trans,
+            cache=self.transform_cache)
         linestyle = utils.get_path_style(patch, fill=patch.get_fill())
-        self.renderer.draw_path(data=vertices,
+        vertices = self._quantize(coordinates, vertices, ax)
+        self.renderer.draw_path(data=self._coords(vertices),
                                 coordinates=coordinates,
                                 pathcodes=pathcodes,
                                 style=linestyle,
                                 mplobj=patch)
 
+    def _svg_path(self, artist, path, transform):
+        """Return utils.SVG_path(path), simplified in display space
+        according to the ``simplify`` option."""
+        if (not self.simplify or not matplotlib.rcParams['path.simplify']
+                or not path.should_simplify or _filled(artist)
+                or artist.get_path_effects() or artist.get_rasterized()
+                or len(path.vertices) < 3):
+            return utils.SVG_path(path)
+        with self._stage("simplify", artist):
+            try:
+                inverse = transform.inverted()
+                display = transform.transform_path(path)
+                vertices, codes = utils.SVG_path(display, simplify=True)
+                if len(vertices):
+                    vertices = inverse.transform(vertices)
+            except (ValueError, np.linalg.LinAlgError):
+                # e.g. singular transforms of empty axes
+                return utils.SVG_path(path)
+        n_vertices = len(path.vertices)
+        if path.codes is not None:
+            n_vertices -= np.count_nonzero(path.codes == mpath.Path.CLOSEPOLY)
+        stats = self.simplify_stats
+        stats['paths'] += 1
+        stats['vertices_in'] += n_vertices
+        stats['vertices_out'] += len(vertices)
+        return vertices, codes
+
+    @_profiled("draw_collection")
     def draw_collection(self, ax, collection,
                         force_pathtrans=None,
                         force_offsettrans=None):
         """Process a matplotlib collection and call renderer.draw_collection"""
+        if (force_pathtrans is None and force_offsettrans is None
+                and self._draw_as_raster(ax, collection)):
+            return
         (transform, transOffset,
          offsets, paths) = prepare_points_for_collection(collection, ax)
 
-        offset_coords, offsets = self.process_transform(
-            transOffset, ax=ax, data=offsets, force_trans=force_offsettrans)
-        path_coords = self.process_transform(
-            transform, ax=ax, force_trans=force_pathtrans)
-
-        processed_paths = [utils.SVG_path(path) for path in paths]
-        processed_paths = [(self.process_transform(
-            transform, ax=ax, data=path[0],
-            force_trans=force_pathtrans)[1], path[1])
-                           for path in processed_paths]
-
         path_transforms = collection.get_transforms()
         try:
             # matplotlib 1.3: path_transforms are transform objects.
@@ -290,10 +743,96 @@ class Exporter(object):
             # matplotlib 1.4: path transforms are already numpy arrays.
             pass
 
-        styles = {'linewidth': collection.get_linewidths(),
-                  'facecolor': collection.get_facecolors(),
-                  'edgecolor': collection.get_edgecolors(),
-                  'dasharray': utils.get_dasharray_list(collection),
+        keep = None
+        if (self.cull and force_pathtrans is None
+                and force_offsettrans is None):
+            with self._stage("cull"):
+                keep = self._cull_collection(ax, collection, transform,
+                                             transOffset, offsets, paths,
+                                             path_transforms)
+            if keep is not None:
+                if not keep.any():
+                    return
+                if len(offsets) == len(keep):
+                    offsets = offsets[keep]
+                else:
+                    paths = [paths[i] for i in np.flatnonzero(keep)]
+
+        def select(values):
+            """Select the style values of the elements kept by culling"""
+            if keep is None or len(values) != len(keep):
+                return values
+            elif isinstance(values, list):
+                return [values[i] for i in np.flatnonzero(keep)]
+            return np.asarray(values)[keep]
+
+        offset_coords, offsets = self.process_transform(
+            transOffset, ax=ax, data=offsets, force_trans=force_offsettrans,
+            cache=self.transform_cache)
+        path_coords = self.process_transform(
+            transform, ax=ax, force_trans=force_pathtrans,
+            cache=self.transform_cache)
+
+        # Transform the vertices of all paths with a single call.
+        if len(path_transforms):
+            processed_paths = [utils.SVG_path(path) for path in paths]
+        else:
+            processed_paths = [self._svg_path(collection, path, transform)
+                               for path in paths]
+        vertex_offsets = np.cumsum([0] + [len(path[0])
+                                          for path in processed_paths])
+        if processed_paths:
+            vertices = np.concatenate([path[0] for path in processed_paths])
+        else:
+            vertices = np.zeros((0, 2))
+        if len(vertices):
+            vertices = self.process_transform(
+                transform, ax=ax, data=vertices, force_trans=force_pathtrans,
+                cache=self.transform_cache)[1]
+        path_transforms = select(path_transforms)
+        offsets = self._coords(self._quantize(offset_coords, offsets, ax))
+        if len(vertices):
+            # the path transforms scale the vertices further
+            scale = (np.abs(np.asarray(path_transforms)[:, :2, :2])
+                     .sum(axis=-1).max() if len(path_transforms) else 1)
+            vertices = self._quantize(path_coords, vertices, ax, scale=scale)
+
+        if getattr(self.renderer, "packed_path_collection", False):
+            pathcodes = [path[1] for path in processed_paths]
+            code_offsets = np.cumsum([0] + [len(codes) for codes in pathcodes])
+            pathcodes = np.array(list(itertools.chain(*pathcodes)),
+                                 dtype='U1')
+            dasharrays, dash_ids = utils.get_dasharray_ids(collection)
+            styles = {'linewidth': select(np.asarray(
+                          collection.get_linewidths(), dtype=float)),
+                      'facecolor': select(np.asarray(
+                          collection.get_facecolors(),
+                          dtype=float).reshape(-1, 4)),
+                      'edgecolor': select(np.asarray(
+                          collection.get_edgecolors(),
+                          dtype=float).reshape(-1, 4)),
+                      'dasharray': dasharrays,
+                      'dash_id': select(dash_ids),
+                      'alpha': collection._alpha,
+                      'zorder': collection.get_zorder()}
+            self.renderer.draw_packed_path_collection(
+                vertices=self._coords(vertices), pathcodes=pathcodes,
+                vertex_offsets=vertex_offsets, code_offsets=code_offsets,
+                path_coordinates=path_coords,
+                path_transforms=path_transforms,
+                offsets=offsets, offset_coordinates=offset_coords,
+                offset_order="after", styles=styles, mplobj=collection)
+            return
+
+        # Split the vertices back into per-path views.
+        processed_paths = [(self._coords(verts), path[1]) for (verts, path)
+                           in zip(np.split(vertices, vertex_offsets[1:-1]),
+                                  processed_paths)]
+
+        styles = {'linewidth': select(collection.get_linewidths()),
+                  'facecolor': select(collection.get_facecolors()),
+                  'edgecolor': select(collection.get_edgecolors()),
+                  'dasharray': select(utils.get_dasharray_list(collection)),
                   'alpha': collection._alpha,
                   'zorder': collection.get_zorder()}
 
@@ -306,9 +845,110 @@ class Exporter(object):
                                            styles=styles,
                                            mplobj=collection)
 
+    def _coords(self, array):
+        """Wrap an array of coordinates for serialize: as a TypedArray if it
+        is large enough for the array_encoding option, else as Coordinates"""
+        if (self.array_encoding is not None
+                and np.size(array) >= self.array_threshold):
+            return TypedArray(array, dtype=self.array_encoding)
+        if type(array) is not np.ndarray:
+            # e.g. None or masked arrays
+            return array
+        return Coordinates(array)
+
+    def _quantize(self, code, data, ax=None, fig=None, scale=1):
+        """Round coordinates according to the precision option"""
+        policy = self.precision.get(code)
+        if policy is None or data is None:
+            return data
+        with self._stage("quantize"):
+            points = np.asarray(data, dtype=float)
+            if policy != "pixel":
+                return quantization.round_significant(points, policy)
+            fig = ax.figure if ax is not None else fig
+            transform = {'data': ax.transData if ax is not None else None,
+                         'axes': ax.transAxes if ax is not None else None,
+                         'figure': fig.transFigure,
+                         'display': transforms.IdentityTransform()}[code]
+            if transform is None:
+                return data
+            return quantization.round_to_pixels(
+                points.reshape(-1, 2), transform, self.pixel_tolerance,
+                scale).reshape(points.shape)
+
+    def _cull_collection(self, ax, collection, transform, transOffset,
+                         offsets, paths, path_transforms):
+        """Return the mask of the elements of the collection in view
+
+        The elements are the offsets of collections of one path (such as
+        scatter plots), or the paths of collections without offsets (such
+        as contours).  Returns None if all the elements are kept, or if the
+        collection has another layout, or style arrays which are cycled
+        over the elements, as culling would change their cycling.
+        """
+        box = culling.view_box(ax, self.cull_margin)
+        if len(offsets) > 1 and len(paths) == 1:
+            pad = culling.collection_pad(paths[0], transform,
+                                         path_transforms)
+            if pad is None:
+                return None
+            keep = culling.points_in_box(transOffset.transform(offsets), box,
+                                         pad)
+        elif len(offsets) <= 1 and len(paths) > 1 and not len(path_transforms):
+            extents = np.array([path.get_extents(transform).extents
+                                for path in paths]).reshape(-1, 4)
+            if len(offsets):
+                extents += np.tile(transOffset.transform(offsets)[0], 2)
+            keep = culling.extents_in_box(extents, box)
+        else:
+            return None
+
+        n = len(keep)
+        for values in [path_transforms, collection.get_linewidths(),
+                       collection.get_facecolors(),
+                       collection.get_edgecolors(),
+                       collection.get_linestyles()]:
+            if len(values) not in (0, 1, n):
+                return None
+        if keep.all():
+            return None
+        return keep
+
+    def _rasterizes(self, artist):
+        """Whether the rasterize options apply to a line, patch or
+        collection of the axes"""
+        count = _vertex_count(artist)
+        if count is None:
+            return False
+        return ((self.rasterize and artist.get_rasterized()) or
+                (self.raster_threshold is not None and
+                 count() > self.raster_threshold))
+
+    def _draw_as_raster(self, ax, artist):
+        """Draw the artist with draw_raster if the rasterize options apply
+        to it, and return whether it was drawn."""
+        if not self._rasterizes(artist):
+            return False
+        self.draw_raster(ax, artist)
+        return True
+
+    @_profiled("draw_raster")
+    def draw_raster(self, ax, artist):
+        """Render a matplotlib artist with Agg and call renderer.draw_image"""
+        imdata, extent = utils.artist_to_base64(artist, ax)
+        self.renderer.draw_image(imdata=imdata,
+                                 extent=extent,
+                                 coordinates="data",
+                                 style={"alpha": None,
+                                        "zorder": artist.get_zorder()},
+                                 mplobj=artist)
+
+    @_profiled("draw_image")
     def draw_image(self, ax, image):
         """Process a matplotlib image object and call renderer.draw_image"""
-        self.renderer.draw_image(imdata=utils.image_to_base64(image),
+        with self._stage("image_to_base64"):
+            imdata = utils.image_to_base64(image)
+        self.renderer.draw_image(imdata=imdata,
                                  extent=image.get_extent(),
                                  coordinates="data",
                                  style={"alpha": image.get_alpha(),
@@ -316,6 +956,170 @@ class Exporter(object):
                                  mplobj=image)
 
 
+class _StreamClosed(Exception):
+    """Raised in the producer of Exporter.iter_events when the consumer
+    stops iterating"""
+
+
+class _StreamError(object):
+    """An exception raised by the producer of Exporter.iter_events"""
+    def __init__(self, error):
+        self.error = error
+
+
+def _precision_policy(precision):
+    """Normalize the precision option to a dict of coordinate policies"""
+    if precision is None:
+        return {}
+    if not isinstance(precision, dict):
+        precision = dict((code, precision)
+                         for code in quantization.COORDINATES)
+    for code, policy in precision.items():
+        if code not in quantization.COORDINATES:
+            raise ValueError("precision coordinates must be in {0}, not "
+                             "{1!r}".format(quantization.COORDINATES, code))
+        if policy != "pixel" and (isinstance(policy, bool) or
+                                  not isinstance(policy, int) or policy < 1):
+            raise ValueError("precision must be a positive number of "
+                             "digits or 'pixel', not {0!r}".format(policy))
+    return dict(precision)
+
+
+def _vertex_count(artist):
+    """A callable returning the number of vertices of a line, patch or
+    collection, or None for other artists"""
+    if isinstance(artist, matplotlib.lines.Line2D):
+        return lambda: len(artist.get_xydata())
+    elif isinstance(artist, matplotlib.patches.Patch):
+        return lambda: len(artist.get_path().vertices)
+    elif isinstance(artist, collections.Collection):
+        return lambda: _collection_size(artist)
+    return None
+
+
+def _collection_size(collection):
+    """Number of offsets and path vertices of a collection"""
+    return (len(collection.get_offsets()) +
+            sum(len(path.vertices) for path in collection.get_paths()))
+
+
+def _filled(artist):
+    """Whether a patch or collection fills its paths"""
+    if artist.get_hatch():
+        return True
+    if isinstance(artist, collections.Collection):
+        facecolors = artist.get_facecolors()
+        return bool(len(facecolors) and np.any(facecolors[:, 3] != 0))
+    return artist.get_facecolor()[3] != 0
+
+
+def _new_simplify_stats():
+    return {'paths': 0, 'vertices_in': 0, 'vertices_out': 0}
+
+
+def decompose_transform(transform, ax=None, fig=None, force_trans=None):
+    """Split a transform into a coordinate code and the remaining transform
+
+    This is the part of :meth:`Exporter.process_transform` which does not
+    depend on the data.
+
+    Returns
+    -------
+    pre_trans : matplotlib transform or None
+        If force_trans is given, the transform mapping the input data to the
+        input of force_trans; otherwise None.
+    code : string
+        Either "data", "axes", "figure", or "display".
+    transform : matplotlib transform
+        The transform mapping the (pre-transformed) data to the coordinates
+        indicated by code.
+    """
+    pre_trans = None
+    if force_trans is not None:
+        pre_trans = transform - force_trans
+        transform = force_trans
+
+    code = "display"
+    fig_ref = ax.figure if ax is not None else fig
+    if ax is not None:
+        for (c, trans) in [("data", ax.transData),
+                           ("axes", ax.transAxes),
+                           ("figure", ax.figure.transFigure),
+                           ("display", transforms.IdentityTransform())]:
+            if transform.contains_branch(trans):
+                code, transform = (c, transform - trans)
+                break
+    elif fig_ref is not None:
+        for (c, trans) in [("figure", fig_ref.transFigure),
+                           ("display", transforms.IdentityTransform())]:
+            if transform.contains_branch(trans):
+                code, transform = (c, transform - trans)
+                break
+    return pre_trans, code, transform
+
+
+class _CacheSentinel(transforms.TransformNode):
+    """Transform node registered as parent of the transforms behind a cache
+    entry: matplotlib's invalidation mechanism marks it invalid whenever one
+    of them is invalidated."""
+    pass_through = True
+
+    def __init__(self, *children):
+        super(_CacheSentinel, self).__init__()
+        self.set_children(*children)
+        self._invalid = 0
+
+
+class TransformCache(object):
+    """Cache of the transform decompositions done by process_transform
+
+    Entries are keyed on the transform, the axes, the figure and force_trans,
+    and store the coordinate code and the reduced transform (never any
+    transformed data).  An entry is dropped as soon as one of the transforms
+    it was computed from is marked invalid.
+
+    Attributes
+    ----------
+    hits : int
+        Number of lookups answered from the cache.
+    misses : int
+        Number of lookups which required a new decomposition.
+    """
+    def __init__(self):
+        self.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """Remove all entries and reset the hit/miss counters"""
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, transform, ax=None, fig=None, force_trans=None):
+        """Return (pre_trans, code, transform); see decompose_transform"""
+        key = (id(transform), id(ax), id(fig), id(force_trans))
+        entry = self._entries.get(key)
+        if entry is not None and not entry[0]._invalid:
+            self.hits += 1
+            return entry[2]
+        self.misses += 1
+        result = decompose_transform(transform, ax, fig, force_trans)
+        fig_ref = ax.figure if ax is not None else fig
+        watched = [transform]
+        if force_trans is not None:
+            watched.append(force_trans)
+        if ax is not None:
+            watched.extend([ax.transData, ax.transAxes])
+        if fig_ref is not None:
+            watched.append(fig_ref.transFigure)
+        # The key objects are kept alive so that their ids are not reused.
+        self._entries[key] = (_CacheSentinel(*watched),
+                              (transform, ax, fig, force_trans), result)
+        return result
+
+
 def prepare_points_for_collection(collection, ax):
     # This code is based on matplotlib's mpl.collections._prepare_points.
     # See: https://matplotlib.org/2.2.2/_modules/matplotlib/collections.html
@@ -0,0 +1,146 @@
+"""
+Incremental Export
+==================
+This submodule contains an exporter which keeps the state of the figure it
+exported, so that exporting the same figure again only sends what changed
+to the renderer::
+
+    exporter = IncrementalExporter(renderer)
+    exporter.run(fig)           # full export
+    line.set_ydata(new_data)
+    exporter.run(fig)           # only the line is exported again
+"""
+import collections
+
+import matplotlib
+
+from . import utils
+from .cache import artist_digest, digest
+from .exporter import Exporter
+
+
+# The elements whose export depends on the view with the view-dependent
+# options.
+_VIEW_ELEMENTS = (matplotlib.lines.Line2D, matplotlib.text.Text,
+                  matplotlib.patches.Patch, matplotlib.collections.Collection)
+
+
+class IncrementalExporter(Exporter):
+    """Exporter sending only the changes of a figure exported before
+
+    The first run of a figure is a full export.  The following runs of the
+    same figure only make these renderer calls:
+
+    - ``renderer.update_axes(ax, props)`` for each axes whose properties
+      (limits, ticks, ...) changed;
+    - ``renderer.remove_element(ax, mplobj)`` for each removed element;
+    - the draw calls of each added or changed element, within the
+      ``renderer.update_element(ax, mplobj)`` context.
+
+    Elements are the texts of the figure, for which ax is None, and the
+    lines, texts, patches, collections, images and legends of the axes.
+    The exported properties of every element are hashed and compared to
+    those of the previous run, so that changes are detected whether or not
+    the figure was drawn in between (which resets Artist.stale).
+
+    The figure is exported in full again if its size or its list of axes
+    changed, or if another figure is exported.
+
+    With the options whose output depends on the view of the axes (cull,
+    decimate, simplify, rasterize, raster_threshold and the "pixel"
+    precision), the lines, texts, patches and collections of an axes whose
+    properties changed are all exported again.
+
+    The parameters are those of Exporter, but close_mpl defaults to False
+    since the figure is meant to be exported again, and the cache option
+    is not supported.
+    """
+    def __init__(self, renderer, close_mpl=False, **kwargs):
+        if kwargs.get('cache') is not None:
+            raise ValueError("IncrementalExporter does not support cache")
+        Exporter.__init__(self, renderer, close_mpl=close_mpl, **kwargs)
+        self._state = None
+
+    def _view_dependent(self):
+        """Whether the export of elements depends on the view of the axes"""
+        return bool(self.cull or self.decimate or self.simplify
+                    or self.rasterize or self.raster_threshold is not None
+                    or "pixel" in self.precision.values())
+
+    def reset(self):
+        """Forget the previous export: the next run is a full export"""
+        self._state = None
+
+    def _run(self, fig):
+        state = self._state
+        if (state is None or state['fig'] is not fig
+                or state['axes'] != [id(ax) for ax in fig.axes]):
+            return self._run_full(fig)
+
+        self.transform_cache.clear()
+        with self._stage("layout"):
+            self.draw_layout(fig)
+        if digest(utils.get_figure_properties(fig)) != state['figure']:
+            return self._run_full(fig)
+        with self._stage("crawl"):
+            state['texts'] = self._update_elements(
+                None, state['texts'], self._iter_fig_texts(fig))
+            for i, ax in enumerate(fig.axes):
+                self._crawl_ax_changes(i, ax)
+
+    def _run_full(self, fig):
+        Exporter._run(self, fig)
+        self._state = {
+            'fig': fig,
+            'axes': [id(ax) for ax in fig.axes],
+            'figure': digest(utils.get_figure_properties(fig)),
+            'axes_props': [digest(utils.get_axes_properties(ax))
+                           for ax in fig.axes],
+            'texts': self._elements(None, fig, self._iter_fig_texts(fig)),
+            'elements': [self._elements(ax, fig, self._iter_ax_elements(ax))
+                         for ax in fig.axes]}
+
+    def _elements(self, ax, fig, elements):
+        """The state of elements: their digests by id"""
+        return collections.OrderedDict(
+            (id(artist), (artist, artist_digest(artist, ax, fig)))
+            for artist, draw in elements)
+
+    def _crawl_ax_changes(self, i, ax):
+        """Make the renderer calls for the changes of the axes"""
+        state = self._state
+        with self._stage("axes_properties"):
+            props = utils.get_axes_properties(ax)
+        props_digest = digest(props)
+        view_changed = False
+        if props_digest != state['axes_props'][i]:
+            self.renderer.update_axes(ax=ax, props=props)
+            state['axes_props'][i] = props_digest
+            view_changed = self._view_dependent()
+
+        state['elements'][i] = self._update_elements(
+            ax, state['elements'][i], self._iter_ax_elements(ax),
+            view_changed)
+
+    def _update_elements(self, ax, previous, elements, view_changed=False):
+        """Make the renderer calls for the changes of elements of the axes
+        (or of the figure, if ax is None), and return their new state"""
+        fig = self._state['fig']
+        current = collections.OrderedDict()
+        changed = []
+        for artist, draw in elements:
+            old = previous.get(id(artist))
+            new_digest = artist_digest(artist, ax, fig)
+            current[id(artist)] = (artist, new_digest)
+            if (old is None or old[0] is not artist or old[1] != new_digest
+                    or (view_changed and isinstance(artist, _VIEW_ELEMENTS))):
+                # changed, or exported for the previous view
+                changed.append((artist, draw))
+
+        for key, (artist, old_digest) in previous.items():
+            if current.get(key, (None,))[0] is not artist:
+                self.renderer.remove_element(ax=ax, mplobj=artist)
+        for artist, draw in changed:
+            with self.renderer.update_element(ax=ax, mplobj=artist):
+                draw()
+        return current
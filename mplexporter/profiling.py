@@ -0,0 +1,183 @@
+"""
+Export Profiling
+================
+This submodule contains a profiler recording where the time of an export
+is spent.  Pass it to the exporter, and read the report after the run::
+
+    profiler = ExportProfiler()
+    Exporter(renderer, profiler=profiler).run(fig)
+    print(profiler.format_report())
+
+The exporter only calls into the profiler when one is given, so profiling
+costs nothing when it is disabled.
+"""
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+
+# Renderer methods called by the exporter (or by the default implementations
+# of other renderer methods) which are timed by the profiler.
+RENDERER_METHODS = ['open_figure', 'close_figure',
+                    'open_axes', 'close_axes',
+                    'open_legend', 'close_legend',
+                    'draw_marked_line', 'draw_line', 'draw_markers',
+                    'draw_text', 'draw_figure_text', 'draw_path',
+                    'draw_path_collection', 'draw_packed_path_collection',
+                    'draw_image']
+
+
+def _new_stats():
+    return {'calls': 0, 'time': 0.0, 'self_time': 0.0,
+            'vertices': 0, 'bytes': 0}
+
+
+def _payload(value):
+    """Return the number of vertices and bytes of a renderer argument"""
+    if isinstance(value, np.ndarray):
+        vertices = value.shape[0] if value.ndim == 2 else 0
+        return vertices, value.nbytes
+    elif isinstance(value, str):
+        return 0, len(value)
+    elif isinstance(value, (list, tuple)):
+        vertices, nbytes = 0, 0
+        for item in value:
+            v, b = _payload(item)
+            vertices += v
+            nbytes += b
+        return vertices, nbytes
+    else:
+        return 0, 0
+
+
+class ExportProfiler(object):
+    """Record wall time, call counts, vertex counts and bytes of an export
+
+    Statistics are collected per stage (exporter steps such as "layout",
+    "axes_properties" or "draw_collection", and renderer methods, named
+    e.g. "renderer.draw_path") and per artist type.  Times are inclusive;
+    "self_time" excludes the time spent in nested stages.  Vertices and
+    bytes are those of the arrays and strings passed to the renderer, and
+    are credited to the outermost renderer call and to all enclosing
+    exporter stages.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Discard all recorded statistics"""
+        self.stages = {}
+        self.artists = {}
+        self.total_time = 0.0
+        self._stack = []
+        self._renderer_depth = 0
+
+    @contextmanager
+    def stage(self, name, artist=None):
+        """Context manager timing a stage of the export"""
+        frame = {'name': name, 'artist': artist, 'child_time': 0.0,
+                 'vertices': 0, 'bytes': 0}
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield frame
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1]['child_time'] += elapsed
+
+            stats = self.stages.setdefault(name, _new_stats())
+            stats['calls'] += 1
+            stats['time'] += elapsed
+            stats['self_time'] += elapsed - frame['child_time']
+            stats['vertices'] += frame['vertices']
+            stats['bytes'] += frame['bytes']
+
+            if artist is not None:
+                stats = self.artists.setdefault(type(artist).__name__,
+                                                _new_stats())
+                stats['calls'] += 1
+                stats['time'] += elapsed
+                stats['self_time'] += elapsed - frame['child_time']
+                stats['vertices'] += frame['vertices']
+                stats['bytes'] += frame['bytes']
+
+    def add_payload(self, vertices, nbytes):
+        """Credit vertices and bytes to all the stages in progress"""
+        for frame in self._stack:
+            frame['vertices'] += vertices
+            frame['bytes'] += nbytes
+
+    def _wrap_renderer_method(self, method):
+        signature = inspect.signature(method)
+        name = "renderer." + method.__name__
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            with self.stage(name):
+                if self._renderer_depth == 0:
+                    arguments = signature.bind(*args, **kwargs).arguments
+                    arguments.pop('mplobj', None)
+                    self.add_payload(*_payload(list(arguments.values())))
+                self._renderer_depth += 1
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    self._renderer_depth -= 1
+        return wrapper
+
+    @contextmanager
+    def profile(self, renderer):
+        """Context manager profiling an export to the given renderer
+
+        Statistics are reset, and the renderer methods are timed by
+        instance-level wrappers which are removed on exit.
+        """
+        self.reset()
+        wrapped = []
+        for name in RENDERER_METHODS:
+            method = getattr(renderer, name, None)
+            if method is None or name in vars(renderer):
+                continue
+            setattr(renderer, name, self._wrap_renderer_method(method))
+            wrapped.append(name)
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.total_time += time.perf_counter() - start
+            for name in wrapped:
+                delattr(renderer, name)
+
+    def report(self):
+        """Return the recorded statistics as a dictionary
+
+        The report has the keys 'total_time', 'stages' and 'artists'; the
+        latter two map names to dictionaries of 'calls', 'time',
+        'self_time', 'vertices' and 'bytes'.
+        """
+        return {'total_time': self.total_time,
+                'stages': dict((name, dict(stats))
+                               for name, stats in self.stages.items()),
+                'artists': dict((name, dict(stats))
+                                for name, stats in self.artists.items())}
+
+    def format_report(self):
+        """Return the report as a text table, sorted by self time"""
+        lines = ["{0:>36s} {1:>8s} {2:>10s} {3:>10s} {4:>10s} {5:>12s}"
+                 .format("stage", "calls", "time (s)", "self (s)",
+                         "vertices", "bytes")]
+        for title, table in [("stages", self.stages),
+                             ("artists", self.artists)]:
+            lines.append(title + ":")
+            for name, stats in sorted(table.items(),
+                                      key=lambda item: -item[1]['self_time']):
+                lines.append("{0:>36s} {1[calls]:8d} {1[time]:10.4f} "
+                             "{1[self_time]:10.4f} {1[vertices]:10d} "
+                             "{1[bytes]:12d}".format(name, stats))
+        lines.append("total: {0:.4f} s".format(self.total_time))
+        return "\n".join(lines)
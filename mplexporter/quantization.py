@@ -0,0 +1,111 @@
+"""
+Coordinate Quantization
+=======================
+This submodule contains tools for rounding exported coordinates to the
+precision they are drawn with, so that they encode to short decimal text.
+Values are rounded to a number of decimals, which is computed either from a
+number of significant digits, or from the size of a pixel: rounding to a
+pixel tolerance keeps every point within that many pixels of its exact
+position, in any coordinates and for any scale or projection.
+"""
+import numpy as np
+
+
+# The coordinate codes returned by Exporter.process_transform.
+COORDINATES = ['data', 'axes', 'figure', 'display']
+
+
+def round_decimals(values, decimals):
+    """Round each value to its number of decimals
+
+    Parameters
+    ----------
+    values : array_like
+        The values to round.
+    decimals : array_like
+        The number of decimals of each value (negative to round to tens,
+        hundreds, ...), broadcast to the shape of values.  Values whose
+        number of decimals is NaN are not rounded.
+
+    Returns
+    -------
+    rounded : ndarray
+        A rounded float copy of values.
+    """
+    values = np.array(values, dtype=float)
+    decimals = np.broadcast_to(decimals, values.shape)
+    # np.round divides by an exact power of ten, which gives the float
+    # nearest to the rounded decimal, i.e. one with a short repr.
+    for d in np.unique(decimals[np.isfinite(decimals)]):
+        mask = decimals == d
+        values[mask] = np.round(values[mask], int(d))
+    return values
+
+
+def significant_decimals(values, digits):
+    """The number of decimals of digits significant digits of each value"""
+    values = np.asarray(values, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        magnitude = np.floor(np.log10(np.abs(values)))
+    magnitude[~np.isfinite(magnitude)] = 0
+    return digits - 1 - magnitude
+
+
+def round_significant(values, digits):
+    """Round values to digits significant digits"""
+    return round_decimals(values, significant_decimals(values, digits))
+
+
+def display_scale(values, transform):
+    """The display distance per unit of each coordinate of the points
+
+    Parameters
+    ----------
+    values : ndarray
+        The (N, 2) points.
+    transform : matplotlib transform
+        The transform from the coordinates of the points to display.
+
+    Returns
+    -------
+    scale : ndarray
+        The (N, 2) number of pixels per unit of each coordinate, estimated
+        by finite differences for non-affine transforms.
+    """
+    values = np.asarray(values, dtype=float)
+    if transform.is_affine:
+        matrix = transform.get_matrix()
+        scale = np.hypot(matrix[0, :2], matrix[1, :2])
+        return np.broadcast_to(scale, values.shape)
+    step = np.where(values != 0, np.abs(values), 1.0) * 1e-7
+    base = transform.transform(values)
+    scale = np.empty_like(values)
+    for j in range(values.shape[1]):
+        shifted = values.copy()
+        shifted[:, j] += step[:, j]
+        delta = transform.transform(shifted) - base
+        scale[:, j] = np.hypot(delta[:, 0], delta[:, 1]) / step[:, j]
+    return scale
+
+
+def pixel_decimals(values, transform, tolerance, scale=1):
+    """The number of decimals keeping each point within tolerance pixels
+
+    Rounding to these decimals moves each point by at most half of
+    tolerance pixels along each coordinate.  scale multiplies the display
+    scale of the coordinates, e.g. for vertices drawn through further
+    path transforms.  The decimals of points with no display scale are NaN.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        step = tolerance / (display_scale(values, transform) * scale)
+        decimals = np.ceil(-np.log10(step))
+    decimals[~np.isfinite(decimals)] = np.nan
+    return decimals
+
+
+def round_to_pixels(values, transform, tolerance, scale=1):
+    """Round the (N, 2) points to the decimals of pixel_decimals"""
+    if not len(values):
+        return np.array(values, dtype=float)
+    return round_decimals(values, pixel_decimals(values, transform,
+                                                 tolerance, scale))
@@ -1,17 +1,25 @@
 import warnings
 import itertools
 from contextlib import contextmanager
-from packaging.version import Version
 
 import numpy as np
-import matplotlib as mpl
-from matplotlib import transforms
+from matplotlib.lines import Line2D
 
 from .. import utils
+from ..events import replay
 from .. import _py3k_compat as py3k
 
 
 class Renderer(object):
+    # Renderers which implement draw_packed_path_collection() set this to
+    # True; the exporter then passes collections to that method instead of
+    # draw_path_collection().
+    packed_path_collection = False
+
+    # Number of path collection elements transformed at once by the default
+    # draw_path_collection().
+    _path_collection_chunksize = 4096
+
     @staticmethod
     def ax_zoomable(ax):
         return bool(ax and ax.get_navigate())
@@ -70,6 +78,67 @@ class Renderer(object):
         self._current_legend = None
         self._legend_props = {}
 
+    def consume(self, events):
+        """
+        Make the renderer calls of a stream of events.
+
+        Parameters
+        ----------
+        events : iterable of mplexporter.events.Event
+            The renderer calls, e.g. from Exporter.iter_events(fig)
+        """
+        replay(events, self)
+
+    # Following are the callbacks of the incremental exporter, which sends
+    # the changes of a figure exported before.  See IncrementalExporter.
+
+    def update_axes(self, ax, props):
+        """
+        The properties of an axes exported before have changed.
+
+        Parameters
+        ----------
+        ax : matplotlib.Axes
+            The Axes which has changed
+        props : dictionary
+            The new dictionary of axes properties
+        """
+        pass
+
+    @contextmanager
+    def update_element(self, ax, mplobj):
+        """
+        Replace the output of an element of an axes.
+
+        The draw commands made within this context (none if the element is
+        not drawn anymore) replace those made for the element before, or
+        add a new element.
+
+        Parameters
+        ----------
+        ax : matplotlib.Axes or None
+            The Axes containing the element, or None for figure texts
+        mplobj : matplotlib object
+            The line, text, patch, collection, image or legend which has
+            changed or has been added.
+        """
+        self._current_ax = ax
+        yield
+        self._current_ax = None
+
+    def remove_element(self, ax, mplobj):
+        """
+        Remove the output of an element exported before.
+
+        Parameters
+        ----------
+        ax : matplotlib.Axes or None
+            The Axes which contained the element, or None for figure texts
+        mplobj : matplotlib object
+            The element which has been removed
+        """
+        pass
+
     # Following are the functions which should be overloaded in subclasses
 
     def open_figure(self, fig, props):
@@ -192,15 +261,12 @@ class Renderer(object):
                        pathcodes=pathcodes, style=pathstyle, mplobj=mplobj)
 
     @staticmethod
-    def _iter_path_collection(paths, path_transforms, offsets, styles):
-        """Build an iterator over the elements of the path collection"""
-        N = max(len(paths), len(offsets))
-
+    def _path_collection_elements(paths, path_transforms, offsets, styles):
+        """Return the lists cycled over the elements of a path collection"""
         # Before mpl 1.4.0, path_transform can be a false-y value, not a valid
         # transformation matrix.
-        if Version(mpl.__version__) < Version('1.4.0'):
-            if path_transforms is None:
-                path_transforms = [np.eye(3)]
+        if path_transforms is None:
+            path_transforms = [np.eye(3)]
 
         edgecolor = styles['edgecolor']
         if np.size(edgecolor) == 0:
@@ -213,12 +279,26 @@ class Renderer(object):
         if dasharray is None or np.size(dasharray) == 0:
             dasharray = ['none']
 
-        elements = [paths, path_transforms, offsets,
-                    edgecolor, styles['linewidth'], facecolor, dasharray]
+        return [paths, path_transforms, offsets,
+                edgecolor, styles['linewidth'], facecolor, dasharray]
 
+    @staticmethod
+    def _iter_path_collection(paths, path_transforms, offsets, styles):
+        """Build an iterator over the elements of the path collection"""
+        N = max(len(paths), len(offsets))
+        elements = Renderer._path_collection_elements(paths, path_transforms,
+                                                      offsets, styles)
         it = itertools
         return it.islice(py3k.zip(*py3k.map(it.cycle, elements)), N)
 
+    @staticmethod
+    def _export_colors(colors):
+        """Export a list of colors, vectorized for arrays of RGBA values"""
+        if (isinstance(colors, np.ndarray) and colors.dtype.kind in 'fiu'
+                and colors.ndim == 2):
+            return utils.export_colors(colors)
+        return [utils.export_color(color) for color in colors]
+
     def draw_path_collection(self, paths, path_coordinates, path_transforms,
                              offsets, offset_coordinates, offset_order,
                              styles, mplobj=None):
@@ -227,8 +307,9 @@ class Renderer(object):
         iterables, and the number of paths is max(len(paths), len(offsets)).
 
         By default, this is implemented via multiple calls to the draw_path()
-        function. For efficiency, Renderers may choose to customize this
-        implementation.
+        function, after transforming the paths and exporting the styles of
+        all elements at once. For efficiency, Renderers may choose to
+        customize this implementation.
 
         Examples of path collections created by matplotlib are scatter plots,
         histograms, contour plots, and many others.
@@ -265,31 +346,139 @@ class Renderer(object):
         if offset_order == "before":
             raise NotImplementedError("offset before transform")
 
-        for tup in self._iter_path_collection(paths, path_transforms,
-                                              offsets, styles):
-            (path, path_transform, offset, ec, lw, fc, da) = tup
-            vertices, pathcodes = path
-            path_transform = transforms.Affine2D(path_transform)
-            vertices = path_transform.transform(vertices)
-            # This is a hack:
-            if path_coordinates == "figure":
-                path_coordinates = "points"
-            style = {"edgecolor": utils.export_color(ec),
-                     "facecolor": utils.export_color(fc),
-                     "edgewidth": lw,
-                     "dasharray": da,
-                     "alpha": styles['alpha'],
-                     "zorder": styles['zorder']}
-            self.draw_path(data=vertices, coordinates=path_coordinates,
-                           pathcodes=pathcodes, style=style, offset=offset,
-                           offset_coordinates=offset_coordinates,
-                           mplobj=mplobj)
+        # This is a hack:
+        if path_coordinates == "figure":
+            path_coordinates = "points"
+
+        N = max(len(paths), len(offsets))
+        elements = self._path_collection_elements(paths, path_transforms,
+                                                  offsets, styles)
+        if N == 0 or min(len(element) for element in elements) == 0:
+            return
+        (paths, path_transforms, offsets,
+         edgecolor, linewidth, facecolor, dasharray) = elements
+        matrices = np.asarray(path_transforms, dtype=float).reshape(-1, 3, 3)
+
+        # Export the styles once per distinct combination of style indices.
+        edgecolor = self._export_colors(edgecolor)
+        facecolor = self._export_colors(facecolor)
+        index = np.arange(N)
+        style_ids, style_index = np.unique(
+            np.column_stack([index % len(edgecolor), index % len(linewidth),
+                             index % len(facecolor), index % len(dasharray)]),
+            axis=0, return_inverse=True)
+        style_list = [{"edgecolor": edgecolor[ec],
+                       "facecolor": facecolor[fc],
+                       "edgewidth": linewidth[lw],
+                       "dasharray": dasharray[da],
+                       "alpha": styles['alpha'],
+                       "zorder": styles['zorder']}
+                      for (ec, lw, fc, da) in style_ids.tolist()]
+        style_index = style_index.ravel()
+
+        # Apply the transforms in chunks of elements: within a chunk, each
+        # path is transformed by all of its distinct matrices at once.
+        path_index = index % len(paths)
+        trans_index = index % len(matrices)
+        for start in range(0, N, self._path_collection_chunksize):
+            chunk = slice(start, start + self._path_collection_chunksize)
+            vertices = [None] * len(index[chunk])
+            # Group the elements of the chunk by path with a single sort.
+            order = np.argsort(path_index[chunk], kind='stable')
+            path_ids, bounds = np.unique(path_index[chunk][order],
+                                         return_index=True)
+            bounds = np.append(bounds, len(order))
+            for p, lo, hi in zip(path_ids.tolist(), bounds[:-1].tolist(),
+                                 bounds[1:].tolist()):
+                members = order[lo:hi]
+                path_vertices = np.asarray(paths[p][0],
+                                           dtype=float).reshape(-1, 2)
+                if hi - lo == 1 or len(matrices) == 1:
+                    # a single transform: no need to look for distinct ones
+                    matrix = matrices[trans_index[chunk][members[0]]]
+                    transformed = (np.dot(path_vertices, matrix[:2, :2].T)
+                                   + matrix[:2, 2])
+                    for member in members:
+                        vertices[member] = transformed
+                    continue
+                trans_ids, inverse = np.unique(trans_index[chunk][members],
+                                               return_inverse=True)
+                transformed = (np.einsum('kij,mj->kmi',
+                                         matrices[trans_ids, :2, :2],
+                                         path_vertices, optimize=True)
+                               + matrices[trans_ids, None, :2, 2])
+                for member, k in zip(members, inverse.ravel()):
+                    vertices[member] = transformed[k]
+
+            for i, verts in zip(index[chunk], vertices):
+                self.draw_path(data=verts, coordinates=path_coordinates,
+                               pathcodes=paths[path_index[i]][1],
+                               style=dict(style_list[style_index[i]]),
+                               offset=offsets[i % len(offsets)],
+                               offset_coordinates=offset_coordinates,
+                               mplobj=mplobj)
+
+    def draw_packed_path_collection(self, vertices, pathcodes,
+                                    vertex_offsets, code_offsets,
+                                    path_coordinates, path_transforms,
+                                    offsets, offset_coordinates, offset_order,
+                                    styles, mplobj=None):
+        """
+        Draw a collection of paths given as packed NumPy arrays.
+
+        The exporter calls this instead of draw_path_collection() when the
+        renderer's ``packed_path_collection`` attribute is True, so that
+        high-volume renderers can serialize the collection in one pass.  By
+        default, the arrays are unpacked and passed to draw_path_collection().
+
+        Parameters
+        ----------
+        vertices : array_like
+            A shape (M, 2) array holding the vertices of all paths.
+        pathcodes : array_like
+            A 1D array holding the single-character SVG pathcodes of all
+            paths.  See draw_path() for a description of these.
+        vertex_offsets : array_like
+            An integer array of length len(paths) + 1: the vertices of path i
+            are vertices[vertex_offsets[i]:vertex_offsets[i + 1]].
+        code_offsets : array_like
+            An integer array of length len(paths) + 1: the pathcodes of path i
+            are pathcodes[code_offsets[i]:code_offsets[i + 1]].
+        path_coordinates, path_transforms, offsets, offset_coordinates,
+        offset_order :
+            See draw_path_collection().
+        styles : dictionary
+            A dictionary with the following entries, where the arrays are
+            cycled over the elements of the collection:
+            'facecolor', 'edgecolor': shape (*, 4) arrays of RGBA values.
+            'linewidth': shape (*,) array of line widths.
+            'dasharray': list of the distinct dash arrays of the collection.
+            'dash_id': integer array of indices into styles['dasharray'].
+            'alpha', 'zorder': scalar values for the whole collection.
+        mplobj : matplotlib object
+            the matplotlib plot element which generated this collection
+        """
+        paths = [(vertices[vertex_offsets[i]:vertex_offsets[i + 1]],
+                  pathcodes[code_offsets[i]:code_offsets[i + 1]].tolist())
+                 for i in range(len(vertex_offsets) - 1)]
+        unpacked_styles = dict(styles)
+        del unpacked_styles['dash_id']
+        unpacked_styles['dasharray'] = [styles['dasharray'][i]
+                                        for i in styles['dash_id']]
+        self.draw_path_collection(paths=paths,
+                                  path_coordinates=path_coordinates,
+                                  path_transforms=path_transforms,
+                                  offsets=offsets,
+                                  offset_coordinates=offset_coordinates,
+                                  offset_order=offset_order,
+                                  styles=unpacked_styles, mplobj=mplobj)
 
     def draw_markers(self, data, coordinates, style, label, mplobj=None):
         """
-        Draw a set of markers. By default, this is done by repeatedly
-        calling draw_path(), but renderers should generally overload
-        this method to provide a more efficient implementation.
+        Draw a set of markers. By default, this is done with a single call
+        to draw_path_collection(), using the marker path for every point
+        as offset, but renderers may overload this method to provide a more
+        efficient implementation.
 
         In matplotlib, markers are created using the plt.plot() command.
 
@@ -306,15 +495,27 @@ class Renderer(object):
             the matplotlib plot element which generated this marker collection
         """
         vertices, pathcodes = style['markerpath']
-        pathstyle = dict((key, style[key]) for key in ['alpha', 'edgecolor',
-                                                       'facecolor', 'zorder',
-                                                       'edgewidth'])
-        pathstyle['dasharray'] = "10,0"
-        for vertex in data:
-            self.draw_path(data=vertices, coordinates="points",
-                           pathcodes=pathcodes, style=pathstyle,
-                           offset=vertex, offset_coordinates=coordinates,
-                           mplobj=mplobj)
+        # draw_path_collection exports the colors of its styles: pass it
+        # the matplotlib colors of the line.
+        if isinstance(mplobj, Line2D):
+            edgecolor = mplobj.get_markeredgecolor()
+            facecolor = mplobj.get_markerfacecolor()
+        else:
+            edgecolor = utils.import_color(style['edgecolor'])
+            facecolor = utils.import_color(style['facecolor'])
+        styles = {'edgecolor': [edgecolor],
+                  'facecolor': [facecolor],
+                  'linewidth': [style['edgewidth']],
+                  'dasharray': ["10,0"],
+                  'alpha': style['alpha'],
+                  'zorder': style['zorder']}
+        self.draw_path_collection(paths=[(vertices, pathcodes)],
+                                  path_coordinates="points",
+                                  path_transforms=[np.eye(3)],
+                                  offsets=data,
+                                  offset_coordinates=coordinates,
+                                  offset_order="after",
+                                  styles=styles, mplobj=mplobj)
 
     def draw_text(self, text, position, coordinates, style,
                   text_type=None, mplobj=None):
@@ -1,3 +1,5 @@
+from contextlib import contextmanager
+
 from .base import Renderer
 
 
@@ -35,6 +37,17 @@ class FakeRenderer(Renderer):
     def close_legend(self, legend):
         self.output += "    closing legend\n"
 
+    def update_axes(self, ax, props):
+        self.output += "  updating axes\n"
+
+    @contextmanager
+    def update_element(self, ax, mplobj):
+        self.output += "  updating {0}\n".format(type(mplobj).__name__)
+        yield
+
+    def remove_element(self, ax, mplobj):
+        self.output += "  removing {0}\n".format(type(mplobj).__name__)
+
     def draw_figure_text(self, text, position, coordinates, style,
                          text_type=None, mplobj=None):
         self.output += "    draw figure text '{0}' {1}\n".format(text, text_type)
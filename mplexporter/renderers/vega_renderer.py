@@ -1,10 +1,105 @@
 import warnings
+import hashlib
 import json
 import random
+
+import numpy as np
+
 from .base import Renderer
+from .. import serialize
 from ..exporter import Exporter
 
 
+class ColumnTable(object):
+    """The values of a Vega data table, stored column-wise
+
+    The table behaves as the list of records ``[{'x': x0, 'y': y0}, ...]``
+    it stands for, but stores each field as a single array.  It is encoded
+    to JSON by :mod:`mplexporter.serialize` in one pass over each column.
+    """
+    def __init__(self, **columns):
+        self.fields = sorted(columns)
+        self.columns = dict((field, np.asarray(column))
+                            for field, column in columns.items())
+        lengths = set(len(column) for column in self.columns.values())
+        if len(lengths) > 1:
+            raise ValueError("columns must have the same length")
+        self._length = lengths.pop() if lengths else 0
+
+    def __len__(self):
+        return self._length
+
+    def add_column(self, field, column):
+        """Add a field to the table"""
+        column = np.asarray(column)
+        if self.fields and len(column) != len(self):
+            raise ValueError("columns must have the same length")
+        self.columns[field] = column
+        self.fields = sorted(self.columns)
+        self._length = len(column)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return dict((field, self.columns[field][index])
+                    for field in self.fields)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def tolist(self):
+        """The values as a list of records of Python scalars"""
+        columns = [self.columns[field].tolist() for field in self.fields]
+        return [dict(zip(self.fields, row)) for row in zip(*columns)]
+
+    def json_chunks(self, encoder):
+        """Encode the values as the list of records, for serialize"""
+        if not len(self):
+            yield "[]"
+            return
+        # The encoder encodes each column in blocks; the columns are then
+        # interleaved, with the keys of all but the first field prefixed to
+        # their values.
+        sep = encoder.item_separator
+        keys = [json.dumps(field) + encoder.key_separator
+                for field in self.fields]
+        yield "["
+        for start in range(0, len(self), encoder.blocksize):
+            stop = start + encoder.blocksize
+            columns = [encoder.array_strings(self.columns[field][start:stop])
+                       for field in self.fields]
+            columns[1:] = [map((sep + key).__add__, column)
+                           for key, column in zip(keys[1:], columns[1:])]
+            rows = map("".join, zip(*columns))
+            if start:
+                yield sep
+            yield "{" + keys[0] + ("}" + sep + "{" + keys[0]).join(rows) + "}"
+        yield "]"
+
+    def to_json(self, **options):
+        """Encode the values as json.dumps would encode the records
+
+        The options are those of serialize.Encoder.
+        """
+        return serialize.dumps(self, **options)
+
+
+def _column_digest(column):
+    """Content hash of an array"""
+    column = np.ascontiguousarray(column)
+    h = hashlib.blake2b(digest_size=16)
+    h.update("{0}{1}".format(column.dtype.str, column.shape).encode('ascii'))
+    h.update(column.data)
+    return h.digest()
+
+
 class VegaRenderer(Renderer):
     def open_figure(self, fig, props):
         self.props = props
@@ -14,6 +109,10 @@ class VegaRenderer(Renderer):
         self.scales = []
         self.axes = []
         self.marks = []
+        # digest of x column -> data table, and digest of y column -> field
+        # of each table: lines sharing data share a table
+        self._tables = {}
+        self._table_fields = {}
             
     def open_axes(self, ax, props):
         if len(self.axes) > 0:
@@ -31,21 +130,42 @@ class VegaRenderer(Renderer):
                             range="height",
                         ),]
 
+    def _data_fields(self, data):
+        """Add the (N, 2) data to the data tables, reusing the table of an
+        identical x column and the field of an identical y column, and
+        return the name of the table and of the x and y fields."""
+        x_digest = _column_digest(data[:, 0])
+        y_digest = _column_digest(data[:, 1])
+        table = self._tables.get(x_digest)
+        if table is None:
+            table = {'name': "table{0:03d}".format(len(self.data) + 1),
+                     'values': ColumnTable(x=data[:, 0], y=data[:, 1])}
+            self.data.append(table)
+            self._tables[x_digest] = table
+            self._table_fields[table['name']] = {y_digest: 'y'}
+            return table['name'], 'x', 'y'
+
+        fields = self._table_fields[table['name']]
+        if y_digest not in fields:
+            fields[y_digest] = "y{0}".format(len(fields) + 1)
+            table['values'].add_column(fields[y_digest], data[:, 1])
+        return table['name'], 'x', fields[y_digest]
+
     def draw_line(self, data, coordinates, style, label, mplobj=None):
         if coordinates != 'data':
             warnings.warn("Only data coordinates supported. Skipping this")
-        dataname = "table{0:03d}".format(len(self.data) + 1)
+        dataname, xfield, yfield = self._data_fields(data)
 
         # TODO: respect the other style settings
-        self.data.append({'name': dataname,
-                          'values': [dict(x=d[0], y=d[1]) for d in data]})
         self.marks.append({'type': 'line',
                            'from': {'data': dataname},
                            'properties': {
                                "enter": {
                                    "interpolate": {"value": "monotone"},
-                                   "x": {"scale": "x", "field": "data.x"},
-                                   "y": {"scale": "y", "field": "data.y"},
+                                   "x": {"scale": "x",
+                                         "field": "data." + xfield},
+                                   "y": {"scale": "y",
+                                         "field": "data." + yfield},
                                    "stroke": {"value": style['color']},
                                    "strokeOpacity": {"value": style['alpha']},
                                    "strokeWidth": {"value": style['linewidth']},
@@ -56,18 +176,18 @@ class VegaRenderer(Renderer):
     def draw_markers(self, data, coordinates, style, label, mplobj=None):
         if coordinates != 'data':
             warnings.warn("Only data coordinates supported. Skipping this")
-        dataname = "table{0:03d}".format(len(self.data) + 1)
+        dataname, xfield, yfield = self._data_fields(data)
 
         # TODO: respect the other style settings
-        self.data.append({'name': dataname,
-                          'values': [dict(x=d[0], y=d[1]) for d in data]})
         self.marks.append({'type': 'symbol',
                            'from': {'data': dataname},
                            'properties': {
                                "enter": {
                                    "interpolate": {"value": "monotone"},
-                                   "x": {"scale": "x", "field": "data.x"},
-                                   "y": {"scale": "y", "field": "data.y"},
+                                   "x": {"scale": "x",
+                                         "field": "data." + xfield},
+                                   "y": {"scale": "y",
+                                         "field": "data." + yfield},
                                    "fill": {"value": style['facecolor']},
                                    "fillOpacity": {"value": style['alpha']},
                                    "stroke": {"value": style['edgecolor']},
@@ -94,12 +214,23 @@ class VegaHTML(object):
                                   axes=renderer.axes,
                                   marks=renderer.marks)
 
+    def to_json(self, **options):
+        """The JSON representation of the Vega specification
+
+        The options are those of serialize.Encoder, e.g. precision.
+        """
+        return serialize.dumps(self.specification, **options)
+
+    def dump(self, fp, **options):
+        """Write the JSON representation of the Vega specification to fp"""
+        serialize.dump(self.specification, fp, **options)
+
     def html(self):
         """Build the HTML representation for IPython."""
         id = random.randint(0, 2 ** 16)
         html = '<div id="vis%d"></div>' % id
         html += '<script>\n'
-        html += VEGA_TEMPLATE % (json.dumps(self.specification), id)
+        html += VEGA_TEMPLATE % (self.to_json(), id)
         html += '</script>\n'
         return html
 
@@ -1,5 +1,6 @@
 import warnings
 from .base import Renderer
+from .. import serialize
 from ..exporter import Exporter
 
 
@@ -43,6 +44,13 @@ class VincentRenderer(Renderer):
         else:
             warnings.warn("Multiple plot elements not yet supported")
 
+    def to_json(self, **options):
+        """The JSON representation of the chart's Vega grammar
+
+        The options are those of serialize.Encoder, e.g. precision.
+        """
+        return serialize.dumps(self.chart.grammar(), **options)
+
 
 def fig_to_vincent(fig):
     """Convert a matplotlib figure to a vincent object"""
@@ -0,0 +1,483 @@
+"""
+JSON Serialization
+==================
+This submodule contains a streaming JSON encoder for renderer output, which
+encodes NumPy arrays and scalars directly::
+
+    from mplexporter import serialize
+    serialize.dump(spec, fileobj, precision=6)
+    text = serialize.dumps(spec)
+
+Arrays are encoded in blocks, straight from their buffers, without building
+Python lists of the whole array; the output is written to file-like objects
+as it is produced.  With the default options the output is the same as
+that of ``json.dumps`` on the equivalent Python objects.
+
+Objects with a ``json_chunks(encoder)`` method are encoded by the strings
+it yields, which lets renderers define compact encodings of their own data
+structures.
+
+Arrays wrapped as :class:`TypedArray` (as done by the ``array_encoding``
+option of the Exporter) are encoded as binary buffers with their dtype and
+shape, either inline in base64 or as references to raw buffers collected by
+the encoder::
+
+    encoder = serialize.Encoder(binary="buffers")
+    text = encoder.encode(spec)    # {"dtype": ..., "shape": ..., "buffer": 0}
+    buffers = encoder.buffers      # the little-endian bytes of each array
+
+With the ``delta`` option, the monotone sequences of arrays wrapped as
+:class:`Coordinates` (as done by the Exporter for line data, vertices and
+offsets), such as the x values of most lines, are encoded as their first
+value followed by their differences, which are shorter and repeat, once the
+values are rounded (see the ``precision`` option of the Exporter)::
+
+    {"delta": [1600000000.0, 60.0, 60.0, 60.0], "decimals": 0}
+"""
+import base64
+import json
+
+import numpy as np
+
+
+NAN_MODES = ['NaN', 'null', 'raise']
+
+BINARY_MODES = ['base64', 'buffers', None]
+
+_INF = float("inf")
+
+_encode_string = json.encoder.encode_basestring_ascii
+
+
+class TypedArray(np.ndarray):
+    """A numeric array which serialize encodes as a binary buffer
+
+    The array is a view of the data converted to the given little-endian
+    dtype, so that it can be used as any other array.  Depending on the
+    ``binary`` option of the encoder, it is encoded as::
+
+        {"dtype": "float32", "shape": [100, 2], "data": "<base64>"}
+        {"dtype": "float32", "shape": [100, 2], "buffer": 3}
+
+    where "buffer" is the index of its bytes in ``Encoder.buffers``, or as
+    a plain list of numbers if ``binary`` is None.
+
+    Parameters
+    ----------
+    array : array_like
+        The numeric data.
+    dtype : dtype (optional)
+        The dtype of the buffer, e.g. "float32".  Default: that of array.
+    """
+    def __new__(cls, array, dtype=None):
+        array = np.asarray(array, dtype=dtype)
+        if array.dtype.kind not in 'iuf':
+            raise TypeError("TypedArray data must be numeric, not {0}"
+                            .format(array.dtype))
+        array = np.ascontiguousarray(
+            array, dtype=array.dtype.newbyteorder('<'))
+        return array.view(cls)
+
+    def json_chunks(self, encoder):
+        """Encode the array according to encoder.binary"""
+        array = self.view(np.ndarray)
+        if (encoder.binary is None or array.ndim == 0
+                or array.dtype.kind not in 'iuf'):
+            # e.g. the results of reductions of typed arrays
+            for chunk in encoder.iter_array(array):
+                yield chunk
+            return
+        array = np.ascontiguousarray(
+            array, dtype=array.dtype.newbyteorder('<'))
+        sep, keysep = encoder.item_separator, encoder.key_separator
+        yield ('{"dtype"' + keysep + json.dumps(array.dtype.name) + sep +
+               '"shape"' + keysep + encoder.encode(list(array.shape)) + sep)
+        data = array.reshape(-1).view(np.uint8)
+        if encoder.binary == "buffers":
+            encoder.buffers.append(data.tobytes())
+            yield '"buffer"' + keysep + str(len(encoder.buffers) - 1) + "}"
+            return
+        yield '"data"' + keysep + '"'
+        # blocks of a multiple of 3 bytes encode to unpadded base64
+        step = 3 * encoder.blocksize
+        for start in range(0, len(data), step):
+            yield base64.b64encode(data[start:start + step]).decode('ascii')
+        yield '"}'
+
+
+class Coordinates(np.ndarray):
+    """An array of coordinates, which serialize may encode as differences
+
+    The array is a view of the data, so that it can be used as any other
+    array.  With the ``delta`` option of the encoder, its monotone
+    sequences are encoded as ``{"delta": [...], "decimals": k}``; other
+    arrays, such as colors, are never delta encoded.
+
+    Parameters
+    ----------
+    array : array_like
+        The coordinates.
+    """
+    def __new__(cls, array):
+        return np.asarray(array).view(cls)
+
+    def json_chunks(self, encoder):
+        """Encode the array according to encoder.delta"""
+        array = self.view(np.ndarray)
+        chunks = None
+        if (encoder.delta and array.ndim in (1, 2)
+                and array.dtype.kind in 'iuf'):
+            chunks = encoder._iter_delta(array)
+        if chunks is None:
+            chunks = encoder.iter_array(array)
+        for chunk in chunks:
+            yield chunk
+
+
+class Encoder(object):
+    """A streaming JSON encoder for nested structures holding NumPy data
+
+    Parameters
+    ----------
+    precision : int (optional)
+        If given, floats are encoded with this number of significant
+        digits.  Default: the shortest representation which reads back to
+        the same value, as json.dumps does.
+    nan : string
+        How non-finite floats are encoded: "NaN" (default) encodes them as
+        NaN, Infinity and -Infinity, as json.dumps does (which JavaScript,
+        but not strict JSON, accepts); "null" encodes them as null; "raise"
+        raises a ValueError.
+    separators : tuple
+        The (item, key) separators.  Default: (", ", ": ").
+    sort_keys : bool
+        If True, encode the items of dictionaries sorted by key.
+    blocksize : int
+        The number of array elements encoded at once.
+    binary : string or None
+        How TypedArrays are encoded: "base64" (default) inline in base64,
+        "buffers" as references to raw buffers appended to the ``buffers``
+        attribute, or None as plain lists of numbers.
+    delta : bool
+        If True, encode the 1D Coordinates of at least 3 finite values which
+        are monotone, and whose values have at most 15 decimals, as
+        ``{"delta": [x0, x1 - x0, x2 - x1, ...], "decimals": k}``; the
+        values are the cumulative sums of the list rounded to k decimals
+        ("decimals" is omitted for integers).  2D arrays with such a column
+        are encoded column-wise, as ``{"columns": [column, ...]}``.  Other
+        arrays are encoded as lists.
+        Default: False.
+    """
+    def __init__(self, precision=None, nan="NaN", separators=(", ", ": "),
+                 sort_keys=False, blocksize=65536, binary="base64",
+                 delta=False):
+        if nan not in NAN_MODES:
+            raise ValueError("nan must be one of {0}, not {1!r}"
+                             .format(NAN_MODES, nan))
+        if binary not in BINARY_MODES:
+            raise ValueError("binary must be one of {0}, not {1!r}"
+                             .format(BINARY_MODES, binary))
+        self.binary = binary
+        self.buffers = []
+        self.delta = delta
+        self.precision = precision
+        self.nan = nan
+        self.item_separator, self.key_separator = separators
+        self.sort_keys = sort_keys
+        self.blocksize = blocksize
+        self._float_format = (None if precision is None
+                              else "%.{0}g".format(int(precision)))
+
+    def default(self, obj):
+        """Return an encodable substitute of an object of unknown type
+
+        Subclasses may override this; the default raises a TypeError.
+        """
+        raise TypeError("Object of type {0} is not JSON serializable"
+                        .format(type(obj).__name__))
+
+    def float_strings(self, values, exact=False):
+        """Encode a 1D float array to a list of strings
+
+        If exact is True, the values are encoded with their shortest repr
+        whatever the precision option.
+        """
+        float_format = None if exact else self._float_format
+        values = np.asarray(values)
+        if values.dtype.kind != 'f':
+            values = values.astype(float)
+        finite = np.isfinite(values)
+        if self.nan == "raise" and not finite.all():
+            raise ValueError("Out of range float values are not JSON "
+                             "compliant")
+        if float_format is None and values.itemsize < 8:
+            # the shortest strings which round-trip in the smaller type,
+            # rather than the digits of its conversion to a double
+            strings = values.astype(str).tolist()
+            for i in np.flatnonzero(~finite):
+                strings[i] = self._nonfinite(values[i])
+            return strings
+        values = values.astype(float)
+        if float_format is None:
+            # json encodes lists of floats in C
+            strings = json.dumps(values.tolist())[1:-1].split(", ")
+            if len(values) == 0:
+                strings = []
+            if self.nan == "null" and not finite.all():
+                for i in np.flatnonzero(~finite):
+                    strings[i] = "null"
+            return strings
+        strings = list(map(float_format.__mod__, values.tolist()))
+        for i in np.flatnonzero(~finite):
+            strings[i] = self._nonfinite(values[i])
+        return strings
+
+    def float_string(self, value):
+        """Encode a single float to a string"""
+        value = float(value)
+        if not -_INF < value < _INF:
+            if self.nan == "raise":
+                raise ValueError("Out of range float values are not JSON "
+                                 "compliant")
+            return self._nonfinite(value)
+        if self._float_format is None:
+            return float.__repr__(value)
+        return self._float_format % value
+
+    def _nonfinite(self, value):
+        if self.nan == "null":
+            return "null"
+        elif value != value:
+            return "NaN"
+        return "Infinity" if value > 0 else "-Infinity"
+
+    def array_strings(self, values, exact=False):
+        """Encode a 1D array to a list of strings; see float_strings"""
+        values = np.asarray(values)
+        if values.dtype.kind == 'f':
+            return self.float_strings(values, exact)
+        elif values.dtype.kind == 'b':
+            return ["true" if v else "false" for v in values.tolist()]
+        elif values.dtype.kind in 'iu':
+            return list(map(str, values.tolist()))
+        return ["".join(self.iterencode(value)) for value in values.tolist()]
+
+    def iter_array(self, array, exact=False):
+        """Yield the chunks of the encoding of an array; see float_strings"""
+        array = np.asarray(array)
+        if array.ndim == 0:
+            yield self.array_strings(array.reshape(1), exact)[0]
+            return
+        sep = self.item_separator
+        if array.ndim == 1:
+            yield "["
+            for start in range(0, len(array), self.blocksize):
+                if start:
+                    yield sep
+                yield sep.join(self.array_strings(
+                    array[start:start + self.blocksize], exact))
+            yield "]"
+            return
+
+        # Encode blocks of rows of the flattened inner dimensions, and nest
+        # them back.
+        inner = array.shape[1:]
+        rows = array.reshape(len(array), -1)
+        rows_per_block = max(self.blocksize // max(rows.shape[1], 1), 1)
+        yield "["
+        for start in range(0, len(rows), rows_per_block):
+            if start:
+                yield sep
+            block = rows[start:start + rows_per_block]
+            strings = self.array_strings(block.ravel(), exact)
+            yield sep.join(_nest(strings, (len(block),) + inner, sep))
+        yield "]"
+
+    def _iter_delta(self, array):
+        """The chunks of the delta encoding of an array, or None"""
+        if array.ndim == 2:
+            columns = [_delta(column) for column in array.T]
+            if all(column is None for column in columns):
+                return None
+            return self._iter_columns(array, columns)
+        encoded = _delta(array)
+        if encoded is None:
+            return None
+        return self._iter_deltas(*encoded)
+
+    def _iter_columns(self, array, columns):
+        yield '{"columns"' + self.key_separator + "["
+        for i, column in enumerate(columns):
+            if i:
+                yield self.item_separator
+            chunks = (self.iter_array(array[:, i]) if column is None
+                      else self._iter_deltas(*column))
+            for chunk in chunks:
+                yield chunk
+        yield "]}"
+
+    def _iter_deltas(self, deltas, decimals):
+        yield '{"delta"' + self.key_separator
+        # the deltas are rounded already, and are not formatted again
+        for chunk in self.iter_array(deltas, exact=True):
+            yield chunk
+        if decimals is not None:
+            yield (self.item_separator + '"decimals"' + self.key_separator +
+                   str(decimals))
+        yield "}"
+
+    def _scalar_string(self, obj):
+        """The encoding of a str, float, int, bool or None, else None"""
+        cls = type(obj)
+        if cls is float:
+            return self.float_string(obj)
+        elif cls is str:
+            return _encode_string(obj)
+        elif cls is int:
+            return int.__repr__(obj)
+        elif obj is None:
+            return "null"
+        elif obj is True:
+            return "true"
+        elif obj is False:
+            return "false"
+        return None
+
+    def iterencode(self, obj):
+        """Yield the chunks of the JSON encoding of obj"""
+        string = self._scalar_string(obj)
+        if string is not None:
+            yield string
+        elif isinstance(obj, str):
+            yield _encode_string(obj)
+        elif isinstance(obj, float):
+            yield self.float_string(obj)
+        elif isinstance(obj, int):
+            yield int.__repr__(obj)
+        elif isinstance(obj, np.integer):
+            yield str(int(obj))
+        elif isinstance(obj, np.floating):
+            yield self.float_strings([obj])[0]
+        elif isinstance(obj, np.bool_):
+            yield "true" if obj else "false"
+        elif isinstance(obj, (TypedArray, Coordinates)):
+            for chunk in obj.json_chunks(self):
+                yield chunk
+        elif isinstance(obj, np.ndarray):
+            for chunk in self.iter_array(obj):
+                yield chunk
+        elif isinstance(obj, dict):
+            yield "{"
+            items = obj.items()
+            if self.sort_keys:
+                items = sorted(items)
+            for i, (key, value) in enumerate(items):
+                key = _encode_string(_key(key)) + self.key_separator
+                if i:
+                    key = self.item_separator + key
+                # scalars are encoded inline, without a nested generator
+                string = self._scalar_string(value)
+                if string is not None:
+                    yield key + string
+                    continue
+                yield key
+                for chunk in self.iterencode(value):
+                    yield chunk
+            yield "}"
+        elif isinstance(obj, (list, tuple)):
+            yield "["
+            for i, value in enumerate(obj):
+                if i:
+                    yield self.item_separator
+                string = self._scalar_string(value)
+                if string is not None:
+                    yield string
+                    continue
+                for chunk in self.iterencode(value):
+                    yield chunk
+            yield "]"
+        elif hasattr(obj, "json_chunks"):
+            for chunk in obj.json_chunks(self):
+                yield chunk
+        else:
+            for chunk in self.iterencode(self.default(obj)):
+                yield chunk
+
+    def encode(self, obj):
+        """Return the JSON encoding of obj"""
+        return "".join(self.iterencode(obj))
+
+
+def _decimals(values, maxdecimals=15):
+    """The smallest number of decimals of the values, or None"""
+    # guess from the first values, then check all the values
+    sample = values[:64]
+    for decimals in range(maxdecimals + 1):
+        if np.array_equal(np.round(sample, decimals), sample):
+            break
+    else:
+        return None
+    if np.array_equal(np.round(values, decimals), values):
+        return decimals
+    return None
+
+
+def _delta(values):
+    """The (deltas, decimals) of a monotone sequence, or None"""
+    if len(values) < 3 or values.dtype.kind not in 'iuf':
+        return None
+    if values.dtype.kind == 'f':
+        if not np.isfinite(values).all():
+            return None
+        decimals = _decimals(values)
+        if decimals is None:
+            return None
+        deltas = np.round(np.diff(values), decimals)
+    else:
+        decimals = None
+        deltas = np.diff(values.astype(np.int64))
+    if not ((deltas >= 0).all() or (deltas <= 0).all()):
+        return None
+    return np.concatenate([values[:1], deltas]), decimals
+
+
+def _key(key):
+    """Convert a dictionary key as json.dumps does"""
+    if isinstance(key, str):
+        return key
+    elif key is None:
+        return "null"
+    elif isinstance(key, (bool, np.bool_)):
+        return "true" if key else "false"
+    elif isinstance(key, (int, float, np.number)):
+        return json.dumps(key.item() if isinstance(key, np.generic) else key)
+    raise TypeError("keys must be str, int, float, bool or None, not {0}"
+                    .format(type(key).__name__))
+
+
+def _nest(strings, shape, sep):
+    """Nest a flat list of encoded values to the given array shape, and
+    return the list of encoded items along the first axis"""
+    for axis in range(len(shape) - 1, 0, -1):
+        size = shape[axis]
+        count = int(np.prod(shape[:axis]))
+        strings = ["[" + sep.join(strings[i * size:(i + 1) * size]) + "]"
+                   for i in range(count)]
+    return strings
+
+
+def iterencode(obj, **options):
+    """Yield the chunks of the JSON encoding of obj; see Encoder"""
+    return Encoder(**options).iterencode(obj)
+
+
+def dumps(obj, **options):
+    """Return the JSON encoding of obj; see Encoder for the options"""
+    return Encoder(**options).encode(obj)
+
+
+def dump(obj, fp, **options):
+    """Write the JSON encoding of obj to the file-like object fp as it is
+    produced; see Encoder for the options"""
+    for chunk in Encoder(**options).iterencode(obj):
+        fp.write(chunk)
@@ -2,8 +2,9 @@ import matplotlib
 import numpy as np
 from packaging.version import Version
 from unittest import SkipTest
-from numpy.testing import assert_warns
+from numpy.testing import assert_warns, assert_equal, assert_allclose
 
+from .. import utils
 from ..exporter import Exporter
 from ..renderers import FakeRenderer, FullFakeRenderer
 from . import plt
@@ -236,3 +237,448 @@ def test_blended():
     fig, ax = plt.subplots()
     ax.axvline(0)
     #assert_warns(UserWarning, fake_renderer_output, fig, FakeRenderer)
+
+
+def test_predraw_modes():
+    def output(predraw):
+        fig, ax = plt.subplots()
+        ax.plot(range(10), 'o-', label='line')
+        ax.scatter(range(3), range(3))
+        ax.set_title("title")
+        ax.legend()
+        renderer = FullFakeRenderer()
+        Exporter(renderer, predraw=predraw).run(fig)
+        return renderer.output
+
+    _assert_output_equal(output("png"), output("layout"))
+
+    try:
+        Exporter(FakeRenderer(), predraw="svg")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError for unknown predraw")
+
+
+def test_transform_cache():
+    fig, ax = plt.subplots()
+    ax.fill_between(range(10), range(10))
+    ax.fill_between(range(10), range(10), range(1, 11))
+    exporter = Exporter(FakeRenderer())
+    exporter.run(fig)
+    cache = exporter.transform_cache
+    assert cache.misses > 0
+    assert cache.hits > 0
+    assert cache.hits + cache.misses > len(cache)
+
+
+def test_transform_cache_invalidation():
+    from ..exporter import TransformCache
+    fig, ax = plt.subplots()
+    line, = ax.plot(range(10))
+    fig.canvas.draw()
+    cache = TransformCache()
+    transform = line.get_transform()
+
+    code, reduced = Exporter.process_transform(transform, ax=ax,
+                                               return_trans=True, cache=cache)
+    assert code == "data"
+    Exporter.process_transform(transform, ax=ax, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    ax.set_xscale('log')
+    Exporter.process_transform(transform, ax=ax, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 2)
+    plt.close(fig)
+
+
+def test_path_collection_paths():
+    from matplotlib.collections import PolyCollection
+    from .. import utils
+
+    class PathsRenderer(FullFakeRenderer):
+        def draw_path_collection(self, paths, path_coordinates, *args,
+                                 **kwargs):
+            self.paths = paths
+            self.path_coordinates = path_coordinates
+
+    np.random.seed(0)
+    verts = [np.random.random((n, 2)) + 1 for n in (3, 5, 4)]
+    fig, ax = plt.subplots()
+    collection = PolyCollection(verts)
+    ax.add_collection(collection)
+    ax.set_yscale('log')
+    ax.autoscale()
+
+    renderer = PathsRenderer()
+    Exporter(renderer, close_mpl=False).run(fig)
+    assert renderer.path_coordinates == "data"
+    assert len(renderer.paths) == 3
+    for path, (vertices, codes) in zip(collection.get_paths(),
+                                       renderer.paths):
+        expected_vertices, expected_codes = utils.SVG_path(path)
+        assert codes == expected_codes
+        np.testing.assert_allclose(vertices, expected_vertices)
+    plt.close(fig)
+
+
+def test_packed_path_collection():
+    from matplotlib.collections import PolyCollection
+
+    class ListRenderer(FullFakeRenderer):
+        def draw_path_collection(self, paths, path_coordinates,
+                                 path_transforms, offsets, offset_coordinates,
+                                 offset_order, styles, mplobj=None):
+            self.paths = paths
+            self.styles = styles
+
+    class PackedRenderer(ListRenderer):
+        packed_path_collection = True
+
+        def draw_packed_path_collection(self, **kwargs):
+            self.packed = kwargs
+            super(PackedRenderer, self).draw_packed_path_collection(**kwargs)
+
+    def export(renderer):
+        np.random.seed(0)
+        fig, ax = plt.subplots()
+        ax.add_collection(PolyCollection(
+            [np.random.random((n, 2)) for n in (3, 5, 4)],
+            linestyles=['-', '--', '-'], facecolors=['red', 'blue']))
+        Exporter(renderer).run(fig)
+        return renderer
+
+    expected = export(ListRenderer())
+    packed = export(PackedRenderer())
+
+    kwargs = packed.packed
+    assert_equal(kwargs['vertex_offsets'], [0, 3, 8, 12])
+    assert_equal(kwargs['code_offsets'], [0, 4, 10, 15])
+    assert kwargs['vertices'].shape == (12, 2)
+    assert kwargs['pathcodes'].shape == (15,)
+    assert kwargs['styles']['facecolor'].shape == (2, 4)
+    assert len(kwargs['styles']['dasharray']) == 2
+    assert_equal(kwargs['styles']['dash_id'], [0, 1, 0])
+
+    assert len(packed.paths) == len(expected.paths)
+    for (v1, c1), (v2, c2) in zip(packed.paths, expected.paths):
+        assert_equal(v1, v2)
+        assert c1 == c2
+    assert packed.styles['dasharray'] == expected.styles['dasharray']
+    assert_equal(packed.styles['facecolor'], expected.styles['facecolor'])
+
+
+def test_markers_as_path_collection():
+    class CollectionRenderer(FakeRenderer):
+        def draw_path_collection(self, paths, path_coordinates,
+                                 path_transforms, offsets, offset_coordinates,
+                                 offset_order, styles, mplobj=None):
+            self.output += ("    draw path collection of {0} paths "
+                            "with {1} offsets\n".format(len(paths),
+                                                        len(offsets)))
+
+    fig, ax = plt.subplots()
+    ax.plot(range(1000), 'o', alpha=0.5)
+
+    _assert_output_equal(fake_renderer_output(fig, CollectionRenderer),
+                         """
+                         opening figure
+                         opening axes
+                         draw path collection of 1 paths with 1000 offsets
+                         closing axes
+                         closing figure
+                         """)
+
+
+def test_marker_colors():
+    class ColorRenderer(FakeRenderer):
+        def draw_path(self, **kwargs):
+            self.colors.append((kwargs['style']['facecolor'],
+                                kwargs['style']['edgecolor']))
+
+    fig, ax = plt.subplots()
+    line, = ax.plot(range(2), 'o', markerfacecolor=(0, 0, 1, 0.5),
+                    markeredgecolor='red')
+    style = utils.get_marker_style(line)
+    for mplobj in [line, None]:
+        renderer = ColorRenderer()
+        renderer.colors = []
+        renderer.draw_markers(line.get_xydata(), 'data', style, None, mplobj)
+        assert renderer.colors == [('rgba(0, 0, 255, 0.5)', '#FF0000')] * 2
+
+
+def test_path_collection_default_styles():
+    class StyleRenderer(FakeRenderer):
+        def __init__(self):
+            FakeRenderer.__init__(self)
+            self.calls = []
+
+        def draw_path(self, **kwargs):
+            self.calls.append(kwargs)
+
+    fig, ax = plt.subplots()
+    ax.scatter(range(3), range(3), s=[10, 20, 30],
+               c=['red', (0, 0, 1, 0.5), 'red'])
+    renderer = StyleRenderer()
+    Exporter(renderer).run(fig)
+
+    assert len(renderer.calls) == 3
+    assert_equal([call['style']['facecolor'] for call in renderer.calls],
+                 ['#FF0000', 'rgba(0, 0, 255, 0.5)', '#FF0000'])
+    assert_equal([call['offset'] for call in renderer.calls],
+                 [[0, 0], [1, 1], [2, 2]])
+    # marker sizes scale the (circular) paths
+    radii = [np.abs(call['data']).max() for call in renderer.calls]
+    np.testing.assert_allclose(np.square(radii) / np.square(radii[0]),
+                               [1, 2, 3])
+
+
+def test_profiler():
+    from ..profiling import ExportProfiler
+    fig, ax = plt.subplots()
+    ax.plot(range(100), '-k')
+    ax.scatter(range(3), range(3))
+
+    profiler = ExportProfiler()
+    renderer = FullFakeRenderer()
+    Exporter(renderer, profiler=profiler).run(fig)
+    report = profiler.report()
+
+    stages = report['stages']
+    for stage in ['layout', 'crawl', 'axes_properties', 'draw_line',
+                  'draw_collection', 'renderer.draw_line',
+                  'renderer.draw_path_collection']:
+        assert stages[stage]['calls'] >= 1, stage
+    assert stages['draw_line']['vertices'] == 100
+    assert stages['renderer.draw_marked_line']['bytes'] >= 100 * 2 * 8
+    assert report['artists']['Line2D']['calls'] == 1
+    assert report['total_time'] >= stages['crawl']['time']
+
+    # the renderer is restored after the export
+    assert 'draw_line' not in vars(renderer)
+
+
+def test_axes_workers():
+    def make_fig():
+        fig, axes = plt.subplots(3, 3)
+        for i, ax in enumerate(axes.flat):
+            ax.plot(np.arange(10 * i), '-o', label='line')
+            ax.scatter(range(i), range(i))
+            ax.fill_between([0, 1], [0, 1], [1, 2])
+            ax.set_title("axes {0}".format(i))
+            if i % 2:
+                ax.legend()
+        fig.suptitle("title")
+        return fig
+
+    serial = FullFakeRenderer()
+    Exporter(serial).run(make_fig())
+    parallel = FullFakeRenderer()
+    Exporter(parallel, axes_workers=4).run(make_fig())
+    assert parallel.output == serial.output
+
+    # legends and rasterized artists are exported from the calling thread,
+    import threading
+
+    class ThreadExporter(Exporter):
+        def crawl_legend(self, ax, legend):
+            threads.add(threading.current_thread())
+            Exporter.crawl_legend(self, ax, legend)
+
+        def draw_raster(self, ax, artist):
+            threads.add(threading.current_thread())
+            Exporter.draw_raster(self, ax, artist)
+
+    def get_axes_properties(ax):
+        threads.add(threading.current_thread())
+        return get_properties(ax)
+
+    threads = set()
+    serial = FullFakeRenderer()
+    Exporter(serial, rasterize=True, raster_threshold=15).run(make_fig())
+    parallel = FullFakeRenderer()
+    # as are the axes properties
+    get_properties = utils.get_axes_properties
+    utils.get_axes_properties = get_axes_properties
+    try:
+        ThreadExporter(parallel, axes_workers=4, rasterize=True,
+                       raster_threshold=15).run(make_fig())
+    finally:
+        utils.get_axes_properties = get_properties
+    assert parallel.output == serial.output
+    assert "draw image" in parallel.output
+    assert threads == set([threading.current_thread()])
+
+
+def test_decimate_line():
+    x = np.linspace(0, 10, 100000)
+    for method in ['minmax', 'lttb']:
+        fig, ax = plt.subplots(dpi=50)
+        ax.plot(x, np.sin(x), '-k')
+        ax.plot(x, np.cos(x), 'o')
+        renderer = FullFakeRenderer()
+        Exporter(renderer, decimate=method).run(fig)
+        lines = renderer.output.splitlines()
+        line = [l for l in lines if 'draw line' in l][0]
+        n_points = int(line.split()[3])
+        assert 0 < n_points < 4 * 320
+        assert 'draw 100000 markers' in renderer.output
+
+
+def test_cull():
+    def make_fig():
+        fig, ax = plt.subplots()
+        x = np.linspace(0, 100, 1001)
+        ax.plot(x, np.sin(x), '-k')
+        ax.plot(x, np.cos(x), 'o')
+        ax.scatter(x, np.sin(x), c=x)
+        ax.set_xlim(0, 10)
+        return fig
+
+    full = FullFakeRenderer()
+    Exporter(full).run(make_fig())
+    culled = FullFakeRenderer()
+    Exporter(culled, cull=True, cull_margin=0).run(make_fig())
+
+    assert "draw line with 1001 points" in full.output
+    assert "draw line with 102 points" in culled.output
+    assert "draw 1001 markers" in full.output
+    assert "draw 101 markers" in culled.output
+    assert "draw path collection with 1001 offsets" in full.output
+    assert "draw path collection with 101 offsets" in culled.output
+
+    def make_fig():
+        fig, ax = plt.subplots()
+        ax.add_patch(plt.Rectangle((50, 0), 1, 1))
+        ax.add_patch(plt.Rectangle((5, 0), 1, 1))
+        ax.contourf(np.arange(100.), np.arange(2.),
+                    np.vstack([np.arange(100.)] * 2), levels=19)
+        ax.set_xlim(0, 10)
+        return fig
+
+    class CollectionRenderer(FakeRenderer):
+        def draw_path_collection(self, paths, **kwargs):
+            self.output += "    draw {0} collection paths\n".format(
+                len(paths))
+
+    full = CollectionRenderer()
+    Exporter(full).run(make_fig())
+    culled = CollectionRenderer()
+    Exporter(culled, cull=True, cull_margin=0).run(make_fig())
+    assert full.output.count("draw path with") == 2
+    assert "draw 20 collection paths" in full.output
+    assert culled.output.count("draw path with") == 1
+    assert "draw 3 collection paths" in culled.output
+
+
+def test_simplify():
+    def make_fig():
+        fig, ax = plt.subplots()
+        x = np.linspace(0, 10, 10000)
+        ax.fill_between(x, np.sin(x), np.sin(x) + 1)
+        ax.add_patch(plt.Polygon(np.column_stack([x, np.cos(x)]),
+                                 closed=False, fill=False))
+        ax.add_collection(matplotlib.collections.LineCollection(
+            [np.column_stack([x, x / 10])]))
+        patch = plt.Polygon(np.column_stack([x, np.cos(x) + 1]),
+                            closed=False, fill=False)
+        patch.set_rasterized(True)
+        ax.add_patch(patch)
+        ax.add_patch(plt.Polygon(np.column_stack([x, np.cos(x) + 2])))
+        return fig
+
+    renderer = FakeRenderer()
+    exporter = Exporter(renderer)
+    exporter.run(make_fig())
+    assert exporter.simplify_stats['paths'] == 0
+    assert renderer.output.count("draw path with 10000 vertices") == 3
+
+    renderer = FakeRenderer()
+    exporter = Exporter(renderer, simplify=True)
+    exporter.run(make_fig())
+    stats = exporter.simplify_stats
+    # the unfilled, open polygon and the line collection
+    assert stats['paths'] == 2
+    assert stats['vertices_in'] == 10000 + 10000
+    assert stats['vertices_out'] < stats['vertices_in'] / 10
+    # the rasterized and the filled patches are not simplified
+    assert renderer.output.count("draw path with 10000 vertices") == 2
+
+    with plt.rc_context({'path.simplify': False}):
+        exporter = Exporter(FakeRenderer(), simplify=True)
+        exporter.run(make_fig())
+        assert exporter.simplify_stats['paths'] == 0
+
+
+def test_rasterize():
+    import base64
+    import io
+    from matplotlib.image import imread
+
+    class ImageRenderer(FullFakeRenderer):
+        def draw_image(self, imdata, extent, coordinates, style,
+                       mplobj=None):
+            self.images.append((imdata, extent, mplobj))
+            FullFakeRenderer.draw_image(self, imdata, extent, coordinates,
+                                        style, mplobj)
+
+    def make_fig():
+        fig, ax = plt.subplots(dpi=50)
+        ax.plot(range(10), '-k', rasterized=True)
+        ax.scatter(np.arange(2000), np.arange(2000))
+        ax.plot(range(10), range(10), '-r')
+        ax.set_xlim(0, 2000)
+        ax.set_ylim(0, 2000)
+        return fig
+
+    renderer = ImageRenderer()
+    renderer.images = []
+    Exporter(renderer).run(make_fig())
+    assert not renderer.images
+
+    renderer = ImageRenderer()
+    renderer.images = []
+    Exporter(renderer, rasterize=True, raster_threshold=1000).run(make_fig())
+    assert len(renderer.images) == 2
+    assert renderer.output.count("draw line with 10 points") == 1
+    assert "draw path collection" not in renderer.output
+
+    fig = make_fig()
+    fig.draw_without_rendering()
+    ax = fig.axes[0]
+    for imdata, extent, mplobj in renderer.images:
+        image = imread(io.BytesIO(base64.b64decode(imdata)))
+        # the image covers the axes, with its extent in data coordinates
+        width, height = ax.bbox.size
+        assert abs(image.shape[1] - width) <= 2
+        assert abs(image.shape[0] - height) <= 2
+        assert_allclose(extent, [0, 2000, 0, 2000], atol=2000 / width * 2)
+        assert image[..., 3].any()
+
+
+def test_array_encoding():
+    from ..events import RecordingRenderer
+    from ..serialize import Coordinates, TypedArray
+
+    fig, ax = plt.subplots()
+    x = np.linspace(0, 10, 2000)
+    ax.plot(x, np.sin(x))
+    ax.plot(x[:10], x[:10])
+    ax.scatter(x, np.cos(x))
+    renderer = RecordingRenderer(FakeRenderer())
+    Exporter(renderer, array_encoding="float32").run(fig)
+    lines = [event.kwargs['data'] for event in renderer.events
+             if event.method == 'draw_marked_line']
+    assert isinstance(lines[0], TypedArray)
+    assert lines[0].dtype == np.float32 and lines[0].shape == (2000, 2)
+    assert_allclose(lines[0][:, 1], np.sin(x), atol=1e-6)
+    assert not isinstance(lines[1], TypedArray)
+    assert isinstance(lines[1], Coordinates)
+    offsets, = [event.kwargs['offsets'] for event in renderer.events
+                if event.method == 'draw_path_collection']
+    assert isinstance(offsets, TypedArray)
+
+    # renderers which do not serialize typed arrays work unchanged
+    renderer = FullFakeRenderer()
+    Exporter(renderer, array_encoding="float64").run(fig)
+    assert renderer.output == fake_renderer_output(fig, FullFakeRenderer)
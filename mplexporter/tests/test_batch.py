@@ -0,0 +1,48 @@
+import matplotlib.pyplot as plt
+
+from ..batch import export_many
+from ..exporter import Exporter
+from ..renderers import FakeRenderer
+
+
+def line_figure():
+    fig, ax = plt.subplots()
+    ax.plot([1, 2, 3], '-k')
+    return fig
+
+
+def broken_figure():
+    raise ValueError("no figure")
+
+
+def get_output(renderer):
+    return renderer.output
+
+
+def expected_output():
+    renderer = FakeRenderer()
+    Exporter(renderer).run(line_figure())
+    return renderer.output
+
+
+def test_export_many_serial():
+    fig = line_figure()
+    results = export_many([line_figure, broken_figure, fig], FakeRenderer,
+                          workers=1, result=get_output)
+    assert results[0].output == expected_output()
+    assert results[0].error is None
+    assert results[1].output is None
+    assert "ValueError: no figure" in results[1].error
+    assert results[2].output == expected_output()
+    assert not plt.fignum_exists(fig.number)
+
+
+def test_export_many_processes():
+    fig = line_figure()
+    results = export_many([line_figure, broken_figure, fig], FakeRenderer,
+                          workers=2, result=get_output, close_mpl=False)
+    assert [r.output for r in results] == [expected_output(), None,
+                                           expected_output()]
+    assert "ValueError: no figure" in results[1].error
+    assert plt.fignum_exists(fig.number)
+    plt.close(fig)
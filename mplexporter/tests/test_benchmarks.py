@@ -0,0 +1,57 @@
+import json
+
+from ..benchmarks import FIGURES, run_benchmarks, compare
+
+
+def test_benchmark_suite():
+    results = run_benchmarks(figures=['large_lines', 'scatter'],
+                             renderers=['FullFakeRenderer', 'VegaRenderer'],
+                             scale=0.001, repeat=1)
+    results = json.loads(json.dumps(results))
+    assert len(results['results']) == 4
+    assert 'matplotlib' in results['metadata']
+    for result in results['results']:
+        if (result['figure'], result['renderer']) == ('scatter',
+                                                      'VegaRenderer'):
+            assert result['unsupported'] and result['stages'] is None
+            continue
+        assert result['error'] is None, result['error']
+        assert set(result['stages']) == set(['layout', 'crawl', 'total'])
+        assert result['stages']['total']['best'] > 0
+        profile = result['profile']
+        assert profile['layout']['time'] > 0
+        assert profile['crawl_ax']['calls'] == 1
+    rows = compare(results, results)
+    assert len(rows) == 3 and all(row[-1] == 1 for row in rows)
+    rows = compare(results, results, stage='draw_line')
+    assert len(rows) == 2
+
+
+def test_benchmark_figures():
+    import matplotlib.pyplot as plt
+    for name, factory in FIGURES.items():
+        fig = factory(scale=0.001)
+        assert fig.axes, name
+        plt.close(fig)
+
+
+def test_axes_workers_benchmark():
+    from ..benchmarks import axes_workers
+    assert axes_workers.time_crawl(2, repeat=1, npoints=100, nsubplots=4) > 0
+
+
+def test_benchmark_errors():
+    from ..benchmarks import suite
+
+    def failing_figure(scale):
+        raise ValueError("no data:")
+
+    suite.FIGURES['failing'] = failing_figure
+    try:
+        result, = run_benchmarks(figures=['failing'],
+                                 renderers=['FakeRenderer'],
+                                 repeat=1)['results']
+    finally:
+        del suite.FIGURES['failing']
+    assert result['error'] == "ValueError: no data:"
+    assert result['stages'] is None and result['profile'] is None
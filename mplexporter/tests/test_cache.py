@@ -0,0 +1,139 @@
+import shutil
+import tempfile
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.colors import ListedColormap, PowerNorm
+
+from ..cache import ExportCache, fingerprint
+from ..exporter import Exporter
+from ..renderers import FakeRenderer, FullFakeRenderer
+
+
+def make_fig(n=100, title="title"):
+    fig, ax = plt.subplots()
+    x = np.linspace(0, 10, n)
+    ax.plot(x, np.sin(x), '-o', label='sin')
+    ax.scatter(x, np.cos(x), c=x)
+    ax.fill_between(x, np.sin(x), 2)
+    ax.set_title(title)
+    ax.legend()
+    return fig
+
+
+def test_fingerprint():
+    assert fingerprint(make_fig()) == fingerprint(make_fig())
+    assert fingerprint(make_fig()) != fingerprint(make_fig(n=101))
+    assert fingerprint(make_fig()) != fingerprint(make_fig(title="other"))
+    fig = make_fig()
+    key = fingerprint(fig)
+    fig.axes[0].lines[0].set_color('red')
+    assert fingerprint(fig) != key
+    fig = make_fig()
+    fig.axes[0].set_xlim(0, 5)
+    assert fingerprint(fig) != key
+
+
+def test_export_cache():
+    class MplobjRenderer(FullFakeRenderer):
+        def draw_path(self, mplobj=None, **kwargs):
+            self.mplobjs.append(mplobj)
+            FullFakeRenderer.draw_path(self, mplobj=mplobj, **kwargs)
+
+    cache = ExportCache()
+    outputs = []
+    for i in range(3):
+        fig = make_fig()
+        renderer = MplobjRenderer()
+        renderer.mplobjs = []
+        Exporter(renderer, cache=cache).run(fig)
+        outputs.append(renderer.output)
+        assert renderer.mplobjs
+        assert all(obj.figure is fig for obj in renderer.mplobjs)
+    assert outputs[0] == outputs[1] == outputs[2]
+    assert (cache.hits, cache.misses, len(cache)) == (2, 1, 1)
+
+    renderer = FullFakeRenderer()
+    Exporter(renderer).run(make_fig())
+    assert renderer.output == outputs[0]
+
+    # the exporter options are part of the key
+    Exporter(FakeRenderer(), cache=cache).run(make_fig())
+    Exporter(FullFakeRenderer(), cache=cache, simplify=True).run(make_fig())
+    assert (cache.hits, cache.misses, len(cache)) == (2, 3, 3)
+
+
+def test_export_cache_colormapped():
+    class ColorRenderer(FakeRenderer):
+        def draw_path(self, style, **kwargs):
+            self.colors.append(style['facecolor'])
+
+    def export(fig, cache=None):
+        renderer = ColorRenderer()
+        renderer.colors = []
+        Exporter(renderer, cache=cache).run(fig)
+        return renderer.colors
+
+    def make_scatter(**kwargs):
+        fig, ax = plt.subplots()
+        ax.scatter([1, 2, 3], [1, 2, 3], **kwargs)
+        return fig
+
+    cache = ExportCache()
+    # figures differing only by the colormapped values or the colormap
+    for kwargs in [dict(c=[1, 2, 3]), dict(c=[3, 2, 1]),
+                   dict(c=[1, 2, 3], cmap='gray'),
+                   dict(c=[1, 2, 3], vmin=0, vmax=10),
+                   # colormaps of the same name, norms of the same type
+                   dict(c=[1, 2, 3], cmap=ListedColormap(['r', 'g'])),
+                   dict(c=[1, 2, 3], cmap=ListedColormap(['b', 'k'])),
+                   dict(c=[1, 2, 3], norm=PowerNorm(0.5)),
+                   dict(c=[1, 2, 3], norm=PowerNorm(3))]:
+        assert (export(make_scatter(**kwargs), cache) ==
+                export(make_scatter(**kwargs)))
+    assert (cache.hits, cache.misses) == (0, 8)
+
+    # the same for images
+    for cmap in [ListedColormap(['r', 'g']), ListedColormap(['b', 'k'])]:
+        fig, ax = plt.subplots()
+        ax.imshow([[0, 1], [1, 0]], cmap=cmap)
+        Exporter(FakeRenderer(), cache=cache).run(fig)
+    assert cache.hits == 0
+
+
+def test_export_cache_rasterized():
+    cache = ExportCache()
+    for rasterized in [False, True]:
+        fig, ax = plt.subplots()
+        ax.plot(np.arange(10), rasterized=rasterized)
+        Exporter(FakeRenderer(), cache=cache, rasterize=True).run(fig)
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_export_cache_eviction():
+    directory = tempfile.mkdtemp()
+    try:
+        _check_eviction(directory)
+    finally:
+        shutil.rmtree(directory)
+
+
+def _check_eviction(directory):
+    cache = ExportCache(directory=directory)
+    Exporter(FakeRenderer(), cache=cache).run(make_fig())
+    size = cache.nbytes
+    assert size > 0
+
+    cache = ExportCache(maxbytes=int(2.5 * size), directory=directory)
+    for title in ["a", "b", "c"]:
+        Exporter(FakeRenderer(), cache=cache).run(make_fig(title=title))
+    assert len(cache) == 2
+    assert cache.nbytes <= cache.maxbytes
+
+    # entries are read back from the directory
+    renderer = FakeRenderer()
+    Exporter(renderer, cache=cache).run(make_fig())
+    assert cache.hits == 1
+    expected = FakeRenderer()
+    Exporter(expected).run(make_fig())
+    assert renderer.output == expected.output
@@ -0,0 +1,64 @@
+import numpy as np
+from numpy.testing import assert_equal
+
+import matplotlib.pyplot as plt
+from matplotlib.path import Path
+from matplotlib.transforms import Affine2D
+
+from ..culling import (cull_line, take, points_in_box, extents_in_box,
+                       collection_pad)
+from ..events import RecordingRenderer
+from ..exporter import Exporter
+from ..renderers import FakeRenderer
+
+
+BOX = (0, 0, 10, 10)
+
+
+def test_cull_line():
+    display = np.array([[-20, 5], [-10, 5], [5, 5], [20, 5], [30, 5],
+                        [40, 5], [5, 20], [5, -20], [30, 30]], dtype=float)
+    indices = cull_line(display, BOX)
+    # the segments crossing the box are kept, with a break between them
+    assert_equal(indices, [1, 2, 3, -1, 5, 6, 7, 8])
+    culled = take(display, indices)
+    assert np.isnan(culled[3]).all()
+    assert_equal(culled[[0, 1, 2]], display[[1, 2, 3]])
+
+    assert_equal(cull_line(display, BOX, connected=False), [2])
+    assert_equal(cull_line(display, BOX, connected=False, pad=10),
+                 [1, 2, 3, 6])
+    assert cull_line(display[[1, 2, 3]], BOX) is None
+
+
+def test_cull_line_nan():
+    display = np.array([[1, 1], [2, 2], [np.nan, np.nan], [3, 3], [4, 4]])
+    assert_equal(cull_line(display, BOX), [0, 1, -1, 3, 4])
+
+
+def test_in_box():
+    points = np.array([[5, 5], [11, 5], [-1, -1]])
+    assert_equal(points_in_box(points, BOX), [True, False, False])
+    assert_equal(points_in_box(points, BOX, pad=1), [True, True, True])
+    extents = np.array([[-5, -5, 1, 1], [11, 0, 12, 1], [-1, 2, 11, 3]])
+    assert_equal(extents_in_box(extents, BOX), [True, False, True])
+
+
+def test_collection_pad():
+    path = Path([[-1, -1], [1, 1]])
+    assert collection_pad(path, Affine2D().scale(2).translate(3, 0), []) == 5
+    polar = plt.figure().add_subplot(projection='polar')
+    assert collection_pad(path, polar.transData, []) is None
+    plt.close(polar.figure)
+
+
+def test_cull_markers():
+    fig, ax = plt.subplots()
+    ax.plot([0.5, 1.02, 1.5], [0.5, 0.5, 0.5], 'o', markersize=20)
+    ax.set_xlim(0, 1)
+    renderer = RecordingRenderer(FakeRenderer())
+    Exporter(renderer, cull=True, cull_margin=0).run(fig)
+    data, = [event.kwargs['data'] for event in renderer.events
+             if event.method == 'draw_marked_line']
+    # the marker centered just out of the view overlaps it
+    assert_equal(data[:, 0], [0.5, 1.02])
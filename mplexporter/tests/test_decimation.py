@@ -0,0 +1,56 @@
+import numpy as np
+from numpy.testing import assert_equal
+
+from ..decimation import decimate, minmax_indices, lttb_indices
+
+
+def test_minmax_indices():
+    x = np.arange(12.)
+    y = np.array([0, 5, -1, 2, 3, 3, 3, 3, 9, 1, -4, 0.])
+    assert_equal(minmax_indices(x, y, 3), [0, 1, 2, 3, 4, 7, 8, 10, 11])
+
+
+def test_lttb_indices():
+    x = np.arange(100.)
+    y = np.zeros(100)
+    y[42] = 10
+    indices = lttb_indices(x, y, 10)
+    assert len(indices) == 10
+    assert indices[0] == 0 and indices[-1] == 99
+    assert 42 in indices
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_decimate():
+    n = 10000
+    display = np.column_stack([np.linspace(0, 100, n),
+                               np.sin(np.arange(n))])
+    for method in ['minmax', 'lttb']:
+        indices = decimate(display, 100, method)
+        assert 0 < len(indices) <= 400
+        assert np.all(np.diff(indices) > 0)
+        assert indices[0] == 0 and indices[-1] == n - 1
+    # min-max decimation keeps the extremes of the line
+    indices = decimate(display, 100, 'minmax')
+    assert display[indices, 1].max() == display[:, 1].max()
+    assert display[indices, 1].min() == display[:, 1].min()
+
+    # short lines are not decimated
+    assert decimate(display[:150], 100) is None
+
+    # lines with decreasing x are decimated, but not lines with
+    # non-monotonic x
+    assert decimate(display[::-1], 100) is not None
+    assert decimate(display[np.random.permutation(n)], 100) is None
+
+
+def test_decimate_nan_gaps():
+    n = 10000
+    display = np.column_stack([np.linspace(0, 100, n), np.ones(n)])
+    display[5000:5003, 1] = np.nan
+    for method in ['minmax', 'lttb']:
+        indices = decimate(display, 100, method)
+        kept = display[indices]
+        gaps = np.flatnonzero(np.isnan(kept[:, 1]))
+        assert len(gaps) == 1
+        assert indices[gaps[0]] == 5000
@@ -0,0 +1,108 @@
+import itertools
+import threading
+import warnings
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from ..exporter import Exporter
+from ..events import Event, RecordingRenderer, replay
+from ..renderers import Renderer, FakeRenderer
+
+
+def test_record_and_replay():
+    target = FakeRenderer()
+    recorder = RecordingRenderer(target)
+    with recorder.draw_figure(fig=None, props={}):
+        with recorder.draw_axes(ax=None, props={}):
+            recorder.draw_text(text="hello", position=(0, 0),
+                               coordinates="data", style={})
+    assert [(e.kind, e.method) for e in recorder.events] == [
+        ("enter", "draw_figure"), ("enter", "draw_axes"),
+        ("call", "draw_text"), ("exit", "draw_axes"),
+        ("exit", "draw_figure")]
+    assert recorder.packed_path_collection is False
+    assert target.output == ""
+
+    replay(recorder.events, target)
+    assert target.output == ("opening figure\n"
+                             "  opening axes\n"
+                             "    draw text 'hello' None\n"
+                             "  closing axes\n"
+                             "closing figure\n")
+
+
+def test_replay_legend_not_implemented():
+    events = [Event("enter", "draw_legend", {'legend': None, 'props': {}}),
+              Event("call", "draw_path",
+                    {'data': None, 'coordinates': 'axes', 'pathcodes': [],
+                     'style': {}, 'mplobj': None}),
+              Event("exit", "draw_legend", {})]
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter('always')
+        replay(events, Renderer())
+    assert "not implemented" in str(w[0].message)
+
+
+def test_iter_events():
+    def make_fig():
+        fig, axes = plt.subplots(2)
+        for ax in axes:
+            ax.plot(np.arange(10), '-o', label='line')
+            ax.scatter(range(5), range(5))
+            ax.legend()
+        return fig
+
+    expected = FakeRenderer()
+    Exporter(expected).run(make_fig())
+
+    events = Exporter(FakeRenderer(), close_mpl=False).iter_events(
+        make_fig(), maxsize=2)
+    first = next(events)
+    assert first.name == "open_figure"
+    renderer = FakeRenderer()
+    renderer.consume(itertools.chain([first], events))
+    assert renderer.output == expected.output
+
+    names = [event.name for event in Exporter(FakeRenderer()).iter_events(
+        make_fig())]
+    assert names[-1] == "close_figure"
+    assert names.count("open_axes") == names.count("close_axes") == 2
+    assert "draw_path_collection" in names
+    assert "draw_marked_line" in names
+
+    # the producer stops when the consumer does
+    threads = threading.active_count()
+    events = Exporter(FakeRenderer()).iter_events(make_fig(), maxsize=1)
+    next(events)
+    events.close()
+    assert threading.active_count() == threads
+
+
+def test_iter_events_error():
+    fig, ax = plt.subplots()
+    ax.set_xscale('symlog')
+    events = Exporter(FakeRenderer()).iter_events(fig)
+    try:
+        list(events)
+    except ValueError as err:
+        assert "Unknown axis scale" in str(err)
+    else:
+        assert False, "no error raised"
+
+
+def test_iter_events_layout_thread():
+    class LayoutExporter(Exporter):
+        def draw_layout(self, fig):
+            threads.append(threading.current_thread())
+            Exporter.draw_layout(self, fig)
+
+    threads = []
+    fig, ax = plt.subplots()
+    ax.plot(np.arange(10))
+    events = LayoutExporter(FakeRenderer(), close_mpl=True).iter_events(fig)
+    assert next(events).name == "open_figure"
+    # laid out and closed in the calling thread, before the crawl
+    assert threads == [threading.current_thread()]
+    assert not plt.fignum_exists(fig.number)
+    assert list(events)[-1].name == "close_figure"
@@ -0,0 +1,120 @@
+import io
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from ..incremental import IncrementalExporter
+from ..renderers import FakeRenderer
+
+
+def make_fig():
+    fig, ax = plt.subplots()
+    x = np.linspace(0, 10, 50)
+    ax.plot(x, np.sin(x), '-k', label='sin')
+    ax.plot(x, np.cos(x), '-r', label='cos')
+    ax.scatter(x, np.cos(x))
+    ax.set_ylim(-2, 2)
+    ax.set_title("title")
+    ax.legend()
+    return fig
+
+
+def run(exporter, fig):
+    exporter.renderer.output = ""
+    exporter.run(fig)
+    return exporter.renderer.output
+
+
+def test_incremental_export():
+    fig = make_fig()
+    ax = fig.axes[0]
+    exporter = IncrementalExporter(FakeRenderer())
+    full = run(exporter, fig)
+    assert full.startswith("opening figure")
+
+    # nothing changed
+    assert run(exporter, fig) == ""
+
+    # one line changed
+    line = ax.lines[0]
+    line.set_ydata(np.zeros(50))
+    assert run(exporter, fig) == ("  updating Line2D\n"
+                                  "    draw path with 50 vertices\n")
+
+    # a text changed, an element was added and another removed
+    ax.set_title("new title")
+    ax.lines[1].remove()
+    ax.plot([0, 1], [0, 1])
+    output = run(exporter, fig).splitlines()
+    assert output[0] == "  removing Line2D"
+    assert output[1:] == ["  updating Line2D",
+                          "    draw path with 2 vertices",
+                          "  updating Text",
+                          "    draw text 'new title' title"]
+
+    # the axes limits changed
+    ax.set_xlim(0, 5)
+    assert run(exporter, fig) == "  updating axes\n"
+
+    # a new legend replaces the old one
+    ax.legend()
+    output = run(exporter, fig).splitlines()
+    assert output[:2] == ["  removing Legend", "  updating Legend"]
+    assert "opening legend" in output[2]
+
+    # a change of figure size triggers a full export
+    fig.set_size_inches(3, 3)
+    assert run(exporter, fig).startswith("opening figure")
+    assert run(exporter, fig) == ""
+
+
+def test_incremental_figure_texts():
+    fig = make_fig()
+    fig.suptitle("title")
+    text = fig.text(0.1, 0.1, "text")
+    exporter = IncrementalExporter(FakeRenderer())
+    run(exporter, fig)
+
+    fig.suptitle("new title")
+    text.set_text("new text")
+    assert run(exporter, fig) == ("  updating Text\n"
+                                  "    draw figure text 'new title' suptitle\n"
+                                  "  updating Text\n"
+                                  "    draw figure text 'new text' None\n")
+    text.remove()
+    assert run(exporter, fig) == "  removing Text\n"
+    plt.close(fig)
+
+
+def test_incremental_drawn_between_runs():
+    fig = make_fig()
+    exporter = IncrementalExporter(FakeRenderer())
+    run(exporter, fig)
+
+    # drawing the figure resets the stale flags of the changed artists
+    fig.axes[0].lines[0].set_color('red')
+    fig.savefig(io.BytesIO())
+    assert run(exporter, fig) == ("  updating Line2D\n"
+                                  "    draw path with 50 vertices\n")
+    plt.close(fig)
+
+
+def test_incremental_view_dependent():
+    fig, ax = plt.subplots()
+    x = np.arange(100.)
+    ax.plot(x, x, '-k')
+    exporter = IncrementalExporter(FakeRenderer(), cull=True)
+    assert "draw path with 100 vertices" in run(exporter, fig)
+
+    # the culled line is exported again for the new view
+    ax.set_xlim(50, 60)
+    output = run(exporter, fig).splitlines()
+    assert output[:2] == ["  updating axes", "  updating Line2D"]
+    assert int(output[2].split()[3]) < 100
+
+    # without view-dependent options only the axes are updated
+    exporter = IncrementalExporter(FakeRenderer())
+    run(exporter, fig)
+    ax.set_xlim(0, 10)
+    assert run(exporter, fig) == "  updating axes\n"
+    plt.close(fig)
@@ -0,0 +1,86 @@
+import json
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal, assert_raises
+
+import matplotlib.transforms as mtransforms
+
+from .. import quantization, serialize
+from ..exporter import Exporter
+from ..events import RecordingRenderer
+from ..renderers import FakeRenderer
+from . import plt
+
+
+def test_round_significant():
+    x = np.array([np.pi, -1234.5678, 1.23456e-7, 0, np.nan])
+    assert_equal(quantization.round_significant(x, 3),
+                 [3.14, -1230, 1.23e-7, 0, np.nan])
+    rounded = quantization.round_significant([0.1 + 0.2], 4)
+    assert repr(float(rounded[0])) == '0.3'
+
+
+def test_round_to_pixels():
+    # 1 unit = 100 pixels in x and 1000 pixels in y
+    transform = mtransforms.Affine2D().scale(100, 1000)
+    points = np.random.RandomState(0).rand(100, 2)
+    rounded = quantization.round_to_pixels(points, transform, 1)
+    assert_equal(rounded[:, 0], np.round(points[:, 0], 2))
+    assert_equal(rounded[:, 1], np.round(points[:, 1], 3))
+    display_error = transform.transform(rounded) - transform.transform(points)
+    assert np.abs(display_error).max() <= 0.5
+
+    # non-affine transforms are rounded point by point
+    fig, ax = plt.subplots()
+    ax.set_xscale('log')
+    ax.set_xlim(1e-3, 1e3)
+    points = np.column_stack([np.logspace(-3, 3, 50), np.linspace(0, 1, 50)])
+    rounded = quantization.round_to_pixels(points, ax.transData, 0.1)
+    display_error = (ax.transData.transform(rounded) -
+                     ax.transData.transform(points))
+    assert np.abs(display_error).max() <= 0.05
+    decimals = quantization.pixel_decimals(points, ax.transData, 0.1)
+    assert len(np.unique(decimals[:, 0])) > 1
+
+
+def test_exporter_precision():
+    fig, ax = plt.subplots()
+    x = np.linspace(0, 10, 1000)
+    ax.plot(x, np.sin(x))
+    ax.scatter(x[:10], x[:10])
+    ax.text(0.123456789, 0.987654321, "text", transform=ax.transAxes)
+
+    def export(**kwargs):
+        renderer = RecordingRenderer(FakeRenderer())
+        Exporter(renderer, close_mpl=False, **kwargs).run(fig)
+        return dict((event.method, event.kwargs) for event in renderer.events
+                    if event.kind == "call")
+
+    events = export(precision={'data': 3})
+    assert_equal(events['draw_marked_line']['data'],
+                 quantization.round_significant(
+                     np.column_stack([x, np.sin(x)]), 3))
+    assert events['draw_text']['position'][0] == 0.123456789
+
+    events = export(precision="pixel", pixel_tolerance=1)
+    data = events['draw_marked_line']['data']
+    display = ax.transData.transform(np.column_stack([x, np.sin(x)]))
+    assert np.abs(ax.transData.transform(data) - display).max() <= 0.5
+    assert len(repr(float(data[1, 0]))) < len(repr(float(x[1])))
+    assert_allclose(events['draw_text']['position'],
+                    [0.123456789, 0.987654321], atol=1e-3)
+    assert_allclose(events['draw_path_collection']['offsets'],
+                    np.column_stack([x[:10], x[:10]]), atol=0.05)
+
+    # rounded float32 arrays keep their short text encoding
+    events = export(precision={'data': 3}, array_encoding="float32")
+    data = events['draw_marked_line']['data']
+    assert data.dtype == np.float32
+    text = serialize.dumps(data, binary=None)
+    rounded = quantization.round_significant(
+        np.column_stack([x, np.sin(x)]), 3)
+    assert len(text) <= len(serialize.dumps(rounded))
+    assert_allclose(json.loads(text), rounded, rtol=1e-6)
+
+    assert_raises(ValueError, Exporter, None, precision=0)
+    assert_raises(ValueError, Exporter, None, precision={'points': 3})
@@ -0,0 +1,121 @@
+import base64
+import io
+import json
+
+import numpy as np
+from numpy.testing import assert_raises
+
+from .. import serialize
+
+
+def test_json_parity():
+    x = np.random.RandomState(0).randn(7, 3)
+    x[2, 1] = np.nan
+    x[3, 0] = np.inf
+    obj = {'a': x, 'b': [np.float64(1.5), np.int32(3), np.bool_(True), None],
+           'c': (np.arange(5), "text\n", {1: np.zeros((2, 0))}),
+           'd': np.array(2.5), 'e': np.array([], dtype=float)}
+    expected = json.dumps({'a': x.tolist(), 'b': [1.5, 3, True, None],
+                           'c': [list(range(5)), "text\n", {1: [[], []]}],
+                           'd': 2.5, 'e': []})
+    assert serialize.dumps(obj) == expected
+    # arrays larger than a block, of any number of dimensions
+    for shape in [(100,), (10, 10), (5, 4, 3)]:
+        a = np.arange(np.prod(shape), dtype=float).reshape(shape) / 7
+        assert (serialize.dumps(a, blocksize=8) ==
+                json.dumps(a.tolist()))
+
+
+def test_precision_and_nan():
+    x = np.array([np.pi, -1234567.0, 1e-7, np.nan, -np.inf])
+    assert serialize.dumps(x, precision=3) == \
+        "[3.14, -1.23e+06, 1e-07, NaN, -Infinity]"
+    assert json.loads(serialize.dumps(x, nan='null')) == \
+        [np.pi, -1234567.0, 1e-7, None, None]
+    assert_raises(ValueError, serialize.dumps, x, nan='raise')
+    # plain floats are encoded as the arrays are
+    values = x.tolist()
+    assert serialize.dumps(values, precision=3) == \
+        serialize.dumps(x, precision=3)
+    assert serialize.dumps({'a': values}) == json.dumps({'a': values})
+    assert (serialize.dumps(values, nan='null') ==
+            serialize.dumps(x, nan='null'))
+    assert_raises(ValueError, serialize.dumps, [np.nan], nan='raise')
+    assert_raises(ValueError, serialize.Encoder, nan='zero')
+    assert_raises(TypeError, serialize.dumps, object())
+
+
+def test_dump_streams():
+    class Chunks(object):
+        def json_chunks(self, encoder):
+            yield "["
+            yield encoder.item_separator.join(encoder.array_strings([1, 2]))
+            yield "]"
+
+    fp = io.StringIO()
+    serialize.dump({'x': Chunks()}, fp, separators=(',', ':'))
+    assert fp.getvalue() == '{"x":[1,2]}'
+    chunks = list(serialize.iterencode(np.ones(10), blocksize=4))
+    assert len(chunks) > 3
+
+
+def test_typed_array():
+    x = np.linspace(0, 1, 12).reshape(6, 2)
+    typed = serialize.TypedArray(x, dtype="float32")
+    assert typed.dtype == np.dtype('<f4')
+    assert np.allclose(typed[:, 1], x[:, 1])
+
+    encoded = json.loads(serialize.dumps({'a': typed}, blocksize=5))['a']
+    assert encoded['dtype'] == 'float32' and encoded['shape'] == [6, 2]
+    data = np.frombuffer(base64.b64decode(encoded['data']), dtype='<f4')
+    assert np.array_equal(data.reshape(6, 2), typed)
+
+    encoder = serialize.Encoder(binary="buffers")
+    encoded = json.loads(encoder.encode([typed, typed[:, 0]]))
+    assert [e['buffer'] for e in encoded] == [0, 1]
+    assert encoder.buffers[1] == typed[:, 0].tobytes()
+
+    # without binary, float32 values are written with their shortest repr
+    text = serialize.dumps(typed, binary=None)
+    assert text == json.dumps(typed.astype(str).astype(float).tolist())
+    assert np.array_equal(np.array(json.loads(text), dtype='f4'), typed)
+    assert serialize.dumps(typed[0, 1]) == "0.09090909"
+    assert_raises(TypeError, serialize.TypedArray, ["a"])
+
+
+def test_delta():
+    t = serialize.Coordinates(1.6e9 + 60. * np.arange(100))
+    encoded = json.loads(serialize.dumps(t, delta=True, precision=3))
+    assert encoded['decimals'] == 0
+    assert_equal = np.testing.assert_array_equal
+    assert_equal(np.round(np.cumsum(encoded['delta']),
+                          encoded['decimals']), t)
+
+    x = np.round(np.linspace(0, 1, 50), 3)
+    y = np.sin(np.arange(50.))
+    xy = serialize.Coordinates(np.column_stack([x, y]))
+    encoded = json.loads(serialize.dumps({'data': xy}, delta=True))['data']
+    deltas, column = encoded['columns']
+    assert_equal(np.round(np.cumsum(deltas['delta']), deltas['decimals']), x)
+    assert_equal(column, y)
+
+    # sequences which are not monotone or not rounded are kept as lists
+    for values in [y, np.linspace(0, 1, 50), np.arange(3) % 2]:
+        assert (serialize.dumps(serialize.Coordinates(values), delta=True) ==
+                json.dumps(values.tolist()))
+    assert serialize.dumps(serialize.Coordinates(np.arange(4)),
+                           delta=True) == '{"delta": [0, 1, 1, 1]}'
+
+    # arrays which are not coordinates, e.g. colors, are never delta encoded
+    rgba = np.column_stack([np.linspace(0, 1, 10)] * 3 + [np.ones(10)])
+    assert (serialize.dumps([rgba, t[:5].view(np.ndarray)], delta=True) ==
+            json.dumps([rgba.tolist(), t[:5].tolist()]))
+
+    # the precision holds while a delta encoding is suspended
+    encoder = serialize.Encoder(precision=3, delta=True)
+    chunks = encoder.iterencode(serialize.Coordinates(np.arange(5.) / 4))
+    assert next(chunks) == '{"delta": '
+    assert next(chunks) == '['
+    assert encoder.float_string(np.pi) == '3.14'
+    assert encoder.encode([np.pi]) == '[3.14]'
+    assert "".join(chunks) == '0.0, 0.25, 0.25, 0.25, 0.25], "decimals": 2}'
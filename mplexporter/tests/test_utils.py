@@ -1,5 +1,7 @@
+import numpy as np
 from numpy.testing import assert_allclose, assert_equal
 from matplotlib import ticker
+from matplotlib.path import Path
 from . import plt
 from .. import utils
 
@@ -12,6 +14,108 @@ def test_path_data():
     assert_equal(codes, ['M', 'C', 'C', 'C', 'C', 'C', 'C', 'C', 'C', 'Z'])
 
 
+def test_marker_path_mathtext():
+    import matplotlib
+    line, = plt.plot([1, 2, 3], marker='$x$')
+    with matplotlib.rc_context({'mathtext.fontset': 'dejavusans'}):
+        sans = utils.get_marker_style(line)['markerpath'][0]
+    with matplotlib.rc_context({'mathtext.fontset': 'cm'}):
+        before = utils.marker_path_cache_info()
+        cm = utils.get_marker_style(line)['markerpath'][0]
+        assert utils.marker_path_cache_info() == before
+    assert sans.shape != cm.shape or not np.allclose(sans, cm)
+
+
+def _iter_segments_SVG_path(path, simplify=False):
+    """Reference implementation of SVG_path using Path.iter_segments"""
+    vertices, codes = [], []
+    for verts, code in path.iter_segments(simplify=simplify):
+        if code != Path.CLOSEPOLY:
+            vertices.extend(verts)
+        codes.append(utils.PATH_DICT[code])
+    return np.reshape(vertices, (-1, 2)), codes
+
+
+def test_path_data_matches_iter_segments():
+    np.random.seed(0)
+    paths = [plt.Circle((0, 0), 1).get_path(),
+             Path.unit_rectangle(),
+             Path(np.random.random((50, 2))),
+             Path([[0, 0], [1, np.nan], [2, 2], [3, 3]]),
+             Path([[0, 0], [1, 1], [2, 2], [0, 0]],
+                  [Path.MOVETO, Path.CURVE3, Path.CURVE3, Path.CLOSEPOLY]),
+             Path([[0, 0], [1, 1], [2, 2], [3, 3]],
+                  [Path.MOVETO, Path.LINETO, Path.STOP, Path.LINETO]),
+             Path(np.cumsum(np.random.random((500, 2)), 0))]
+    for path in paths:
+        for simplify in [False, True]:
+            vertices, codes = utils.SVG_path(path, simplify=simplify)
+            ref_vertices, ref_codes = _iter_segments_SVG_path(path, simplify)
+            assert_equal(codes, ref_codes)
+            assert_equal(vertices, ref_vertices)
+
+    vertices, codes = utils.SVG_path(Path(np.zeros((0, 2))))
+    assert_equal(vertices.shape, (0, 2))
+    assert_equal(codes, [])
+
+
+def test_export_color():
+    assert_equal(utils.export_color('red'), '#FF0000')
+    assert_equal(utils.export_color(None), 'none')
+    assert_equal(utils.export_color((0, 0, 1, 0)), 'none')
+    assert_equal(utils.export_color(np.array([0, 0, 1, 0.5])),
+                 'rgba(0, 0, 255, 0.5)')
+
+
+def test_import_color():
+    for color in ['red', 'none', (0, 0, 1, 0.5), (0.1, 0.2, 0.3, 0.4)]:
+        exported = utils.export_color(color)
+        assert_equal(utils.export_color(utils.import_color(exported)),
+                     exported)
+
+
+def test_export_colors():
+    np.random.seed(0)
+    colors = np.random.random((100, 4))
+    colors[::3, 3] = 1
+    colors[::7, 3] = 0
+    assert_equal(utils.export_colors(colors),
+                 [utils.export_color(color) for color in colors])
+    assert_equal(utils.export_colors(['red', 'none', (0, 0, 1, 0.5)]),
+                 ['#FF0000', 'none', 'rgba(0, 0, 255, 0.5)'])
+    assert_equal(utils.export_colors([(1, 0, 0, 1), (0, 0, 1, 0.5)], 'int'),
+                 [0xFF0000FF, 0x0000FF80])
+
+
+def test_marker_path_cache():
+    line, = plt.plot([1, 2, 3], 'o', markersize=7.5)
+    before = utils.marker_path_cache_info()
+    style1 = utils.get_marker_style(line)
+    style2 = utils.get_marker_style(line)
+    after = utils.marker_path_cache_info()
+    assert after.hits >= before.hits + 1
+
+    vertices, codes = style2['markerpath']
+    assert_equal(vertices, style1['markerpath'][0])
+    assert_equal(codes, style1['markerpath'][1])
+    assert not vertices.flags.writeable
+    assert_equal(codes, ['M', 'C', 'C', 'C', 'C', 'C', 'C', 'C', 'C', 'Z'])
+
+
+def test_marker_path_fillstyle():
+    import matplotlib
+    full = utils.get_marker_path('o', 7.5, 'full')
+    with matplotlib.rc_context({'markers.fillstyle': 'left'}):
+        line, = plt.plot([1, 2, 3], 'o', markersize=7.5)
+        left = utils.get_marker_style(line)['markerpath']
+        vertices, codes = utils.get_marker_path('o', 7.5)
+    assert_equal(vertices, left[0])
+    assert codes == left[1]
+    assert len(left[1]) == 6 and len(full[1]) == 10
+    line.set_fillstyle('full')
+    assert utils.get_marker_style(line)['markerpath'][1] == full[1]
+
+
 def test_linestyle():
     linestyles = {'solid': 'none', '-': 'none',
                   #'dashed': '6,6', '--': '6,6',
@@ -0,0 +1,67 @@
+import json
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from ..exporter import Exporter
+from ..renderers import VegaRenderer
+from ..renderers.vega_renderer import VegaHTML, ColumnTable
+from ..serialize import dumps
+
+
+def test_column_table():
+    table = ColumnTable(x=np.array([1., 2.]), y=np.array([3., np.nan]))
+    assert len(table) == 2
+    assert table[0] == {'x': 1., 'y': 3.}
+    assert table.tolist()[1]['x'] == 2.
+    assert table[:1] == [{'x': 1., 'y': 3.}]
+    assert ColumnTable(x=[1, 2]) == [{'x': 1}, {'x': 2}]
+    assert table.to_json() == json.dumps(table.tolist())
+    assert ColumnTable(x=[], y=[]).to_json() == "[]"
+
+
+def test_vega_spec():
+    fig, ax = plt.subplots()
+    x = np.linspace(0, 10, 100)
+    y = np.sin(x)
+    y[10] = np.nan
+    ax.plot(x, y, '-o')
+    ax.set_xlabel("x")
+    renderer = VegaRenderer()
+    Exporter(renderer).run(fig)
+
+    # the line and its markers share a data table
+    assert [data['name'] for data in renderer.data] == ['table001']
+    assert [mark['from']['data'] for mark in renderer.marks] == [
+        'table001', 'table001']
+    spec = VegaHTML(renderer).specification
+    text = VegaHTML(renderer).to_json()
+
+    # the columnar tables encode to the spec of per-point records
+    records = dict(spec, data=[dict(data, values=[dict(x=d[0], y=d[1])
+                                                  for d in np.column_stack(
+                                                      [x, y])])
+                               for data in spec['data']])
+    assert text == json.dumps(records)
+    assert dumps({'a': [ColumnTable(x=[1.]), 2]}) == '{"a": [[{"x": 1.0}], 2]}'
+
+
+def test_vega_shared_tables():
+    fig, ax = plt.subplots()
+    x = np.linspace(0, 10, 100)
+    ax.plot(x, np.sin(x))
+    ax.plot(x, np.cos(x))
+    ax.plot(x, np.sin(x), 'o')
+    ax.plot(x[::-1], np.sin(x))
+    renderer = VegaRenderer()
+    Exporter(renderer).run(fig)
+
+    assert len(renderer.data) == 2
+    assert renderer.data[0]['values'].fields == ['x', 'y', 'y2']
+    fields = [(mark['from']['data'],
+               mark['properties']['enter']['y']['field'])
+              for mark in renderer.marks]
+    assert fields == [('table001', 'data.y'), ('table001', 'data.y2'),
+                      ('table001', 'data.y'), ('table002', 'data.y')]
+    values = json.loads(VegaHTML(renderer).to_json())['data'][0]['values']
+    assert values[1] == {'x': x[1], 'y': np.sin(x[1]), 'y2': np.cos(x[1])}
@@ -3,7 +3,9 @@ Utility Routines for Working with Matplotlib Objects
 ====================================================
 """
 import itertools
+import functools
 import io
+import re
 import base64
 
 import numpy as np
@@ -19,17 +21,100 @@ from matplotlib import ticker
 from .convertors import StrMethodTickFormatterConvertor
 
 
-def export_color(color):
-    """Convert matplotlib color code to hex color or RGBA color"""
-    if color is None or colorConverter.to_rgba(color)[3] == 0:
+_NTH_COLOR = re.compile(r"^C[0-9]+$")
+
+
+def _export_color(color):
+    if color is None:
+        return 'none'
+    rgba = colorConverter.to_rgba(color)
+    if rgba[3] == 0:
         return 'none'
-    elif colorConverter.to_rgba(color)[3] == 1:
-        rgb = colorConverter.to_rgb(color)
-        return '#{0:02X}{1:02X}{2:02X}'.format(*(int(255 * c) for c in rgb))
+    elif rgba[3] == 1:
+        return '#{0:02X}{1:02X}{2:02X}'.format(*(int(255 * c)
+                                                 for c in rgba[:3]))
     else:
-        c = colorConverter.to_rgba(color)
         return "rgba(" + ", ".join(str(int(np.round(val * 255)))
-                                        for val in c[:3])+', '+str(c[3])+")"
+                                   for val in rgba[:3])+', '+str(rgba[3])+")"
+
+
+_export_color_cached = functools.lru_cache(maxsize=512)(_export_color)
+
+
+def import_color(color):
+    """Convert a color returned by export_color back to an RGBA tuple"""
+    if color.startswith('rgba('):
+        values = [float(value) for value in color[5:-1].split(',')]
+        return tuple(value / 255 for value in values[:3]) + (values[3],)
+    return colorConverter.to_rgba(color)
+
+
+def export_color(color):
+    """Convert matplotlib color code to hex color or RGBA color"""
+    if isinstance(color, np.ndarray) and color.ndim == 1:
+        color = tuple(color.tolist())
+    if isinstance(color, str) and _NTH_COLOR.match(color):
+        # "CN" colors depend on the current property cycle: don't cache them
+        return _export_color(color)
+    try:
+        return _export_color_cached(color)
+    except TypeError:
+        # unhashable color specification
+        return _export_color(color)
+
+
+_HEX_BYTES = np.array(['{0:02X}'.format(i) for i in range(256)])
+
+
+def _join_strings(*parts):
+    """Element-wise concatenation of string arrays and scalars"""
+    return functools.reduce(np.char.add, parts)
+
+
+def export_colors(colors, encoding="css"):
+    """Convert an array of colors to hex or RGBA colors in a single pass
+
+    Parameters
+    ----------
+    colors : array_like
+        A shape (N, 4) array of RGBA values, or anything else accepted by
+        matplotlib.colors.to_rgba_array.
+    encoding : string
+        "css" (default) returns a list of the strings export_color() would
+        return for each color.  "int" returns an array of unsigned 32-bit
+        integers 0xRRGGBBAA, each channel being round(255 * value).
+
+    Returns
+    -------
+    colors : list or array
+        The exported colors.
+    """
+    rgba = np.asarray(matplotlib.colors.to_rgba_array(colors), dtype=float)
+    if encoding == "int":
+        channels = np.round(255 * np.clip(rgba, 0, 1)).astype(np.uint32)
+        return ((channels[:, 0] << 24) | (channels[:, 1] << 16)
+                | (channels[:, 2] << 8) | channels[:, 3])
+    elif encoding != "css":
+        raise ValueError("encoding must be 'css' or 'int', "
+                         "not {0!r}".format(encoding))
+
+    alpha = rgba[:, 3]
+    out = np.full(len(rgba), 'none', dtype=object)
+
+    opaque = (alpha == 1)
+    if opaque.any():
+        hex_bytes = _HEX_BYTES[(255 * rgba[opaque, :3]).astype(int)]
+        out[opaque] = _join_strings('#', hex_bytes[:, 0], hex_bytes[:, 1],
+                                    hex_bytes[:, 2])
+
+    translucent = (alpha != 0) & ~opaque
+    if translucent.any():
+        rgb = np.round(rgba[translucent, :3] * 255).astype(int).astype(str)
+        alphas = np.array([str(a) for a in alpha[translucent].tolist()])
+        out[translucent] = _join_strings('rgba(', rgb[:, 0], ', ',
+                                         rgb[:, 1], ', ', rgb[:, 2], ', ',
+                                         alphas, ')')
+    return [str(color) for color in out]
 
 
 def _many_to_one(input_dict):
@@ -94,12 +179,38 @@ def get_dasharray_list(collection):
     return [dasharray_from_linestyle(ls) for ls in linestyles]
 
 
+def get_dasharray_ids(collection):
+    """Return the unique SVG dash arrays of a Collection and their indices
+
+    Returns
+    -------
+    dasharrays : list
+        The distinct dash arrays returned by get_dasharray_list(), in order
+        of first appearance.
+    dash_ids : array
+        Integer array giving, for each entry of get_dasharray_list(), its
+        index in dasharrays.
+    """
+    dasharray_list = get_dasharray_list(collection) or []
+    index = {}
+    dash_ids = np.array([index.setdefault(da, len(index))
+                         for da in dasharray_list], dtype=int)
+    return list(index), dash_ids
+
+
 PATH_DICT = {Path.LINETO: 'L',
              Path.MOVETO: 'M',
              Path.CURVE3: 'S',
              Path.CURVE4: 'C',
              Path.CLOSEPOLY: 'Z'}
 
+# Lookup tables indexed by matplotlib path code
+_SVG_CODES = np.array([''] * (max(PATH_DICT) + 1), dtype='U1')
+_NUM_VERTICES = np.ones(max(PATH_DICT) + 1, dtype=int)
+for _code, _svg_code in PATH_DICT.items():
+    _SVG_CODES[_code] = _svg_code
+    _NUM_VERTICES[_code] = Path.NUM_VERTICES_FOR_CODE[_code]
+
 
 def SVG_path(path, transform=None, simplify=False):
     """Construct the vertices and SVG codes for the path
@@ -125,18 +236,46 @@ def SVG_path(path, transform=None, simplify=False):
     if transform is not None:
         path = path.transformed(transform)
 
-    vc_tuples = [(vertices if path_code != Path.CLOSEPOLY else [],
-                  PATH_DICT[path_code])
-                 for (vertices, path_code)
-                 in path.iter_segments(simplify=simplify)]
+    vertices = np.asarray(path.vertices, dtype=float)
+    if len(vertices) and (simplify or not np.isfinite(vertices).all()):
+        # Let matplotlib remove NaNs (and simplify) exactly as
+        # Path.iter_segments() would.
+        path = path.cleaned(remove_nans=True, simplify=simplify, curves=True)
+        vertices = np.asarray(path.vertices, dtype=float)
+
+    codes = path.codes
+    if codes is None:
+        codes = np.full(len(vertices), Path.LINETO, dtype=Path.code_type)
+        codes[:1] = Path.MOVETO
+    else:
+        codes = np.asarray(codes)
+        stop = np.flatnonzero(codes == Path.STOP)
+        if stop.size:
+            codes = codes[:stop[0]]
+            vertices = vertices[:stop[0]]
 
-    if not vc_tuples:
+    if not len(codes):
         # empty path is a special case
         return np.zeros((0, 2)), []
-    else:
-        vertices, codes = zip(*vc_tuples)
-        vertices = np.array(list(itertools.chain(*vertices))).reshape(-1, 2)
-        return vertices, list(codes)
+
+    # CLOSEPOLY segments do not emit their (ignored) vertex.
+    is_close = (codes == Path.CLOSEPOLY)
+    if is_close.any():
+        vertices = vertices[~is_close]
+
+    if (codes >= Path.CURVE3).sum() > is_close.sum():
+        # Curve codes are repeated for every vertex they consume: a segment
+        # starts at every position whose offset into its run of identical
+        # codes is a multiple of the number of vertices of that code.
+        index = np.arange(len(codes))
+        run_start = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        run_offset = index - np.repeat(run_start,
+                                       np.diff(np.r_[run_start, len(codes)]))
+        codes = codes[(run_offset % _NUM_VERTICES[codes]) == 0]
+
+    # Always return a new array, never a view of the path's vertices.
+    vertices = np.array(vertices, dtype=float).reshape(-1, 2)
+    return vertices, _SVG_CODES[codes].tolist()
 
 
 def get_path_style(path, fill=True):
@@ -170,6 +309,54 @@ def get_line_style(line):
     return style
 
 
+def _marker_path(marker, markersize, fillstyle):
+    markerstyle = MarkerStyle(marker, fillstyle)
+    markertransform = (markerstyle.get_transform()
+                       + Affine2D().scale(markersize, -markersize))
+    vertices, codes = SVG_path(markerstyle.get_path(), markertransform)
+    vertices.setflags(write=False)
+    return vertices, tuple(codes)
+
+
+_marker_path_cached = functools.lru_cache(maxsize=256)(_marker_path)
+
+
+def _is_mathtext(marker):
+    return len(marker) > 1 and marker.startswith('$') and marker.endswith('$')
+
+
+def get_marker_path(marker, markersize, fillstyle=None):
+    """Return the exported (vertices, pathcodes) of a marker
+
+    The path of half-filled markers (e.g. fillstyle "left") is that of the
+    filled half.  fillstyle defaults to the ``markers.fillstyle`` rcParam.
+
+    Paths of markers given by a string, integer or tuple specification are
+    kept in a bounded LRU cache, keyed by marker, size and fill style; the
+    returned vertices are read-only.  Mathtext markers ("$...$") are not
+    cached, since their glyphs depend on the mathtext and font rcParams.
+    """
+    if fillstyle is None:
+        fillstyle = matplotlib.rcParams['markers.fillstyle']
+    if isinstance(marker, str) and _is_mathtext(marker):
+        vertices, codes = _marker_path(marker, markersize, fillstyle)
+    elif isinstance(marker, (str, int, tuple)):
+        try:
+            vertices, codes = _marker_path_cached(marker, markersize,
+                                                  fillstyle)
+        except TypeError:
+            # unhashable marker specification, e.g. a tuple of arrays
+            vertices, codes = _marker_path(marker, markersize, fillstyle)
+    else:
+        vertices, codes = _marker_path(marker, markersize, fillstyle)
+    return vertices, list(codes)
+
+
+def marker_path_cache_info():
+    """Return the hits, misses, maxsize and currsize of the marker cache"""
+    return _marker_path_cached.cache_info()
+
+
 def get_marker_style(line):
     """Get the style dictionary for matplotlib marker objects"""
     style = {}
@@ -182,12 +369,9 @@ def get_marker_style(line):
     style['edgewidth'] = line.get_markeredgewidth()
 
     style['marker'] = line.get_marker()
-    markerstyle = MarkerStyle(line.get_marker())
     markersize = line.get_markersize()
-    markertransform = (markerstyle.get_transform()
-                       + Affine2D().scale(markersize, -markersize))
-    style['markerpath'] = SVG_path(markerstyle.get_path(),
-                                   markertransform)
+    style['markerpath'] = get_marker_path(line.get_marker(), markersize,
+                                          line.get_fillstyle())
     style['markersize'] = markersize
     style['zorder'] = line.get_zorder()
     return style
@@ -418,3 +602,50 @@ def image_to_base64(image):
 
     binary_buffer.seek(0)
     return base64.b64encode(binary_buffer.read()).decode('utf-8')
+
+
+def artist_to_base64(artist, ax):
+    """
+    Render a matplotlib artist alone to a base64 png, cropped to the axes
+
+    Parameters
+    ----------
+    artist : matplotlib artist
+        The artist to be rendered, with the Agg renderer.
+    ax : matplotlib Axes object
+        The axes containing the artist.
+
+    Returns
+    -------
+    image_base64 : string
+        The UTF8-encoded base64 string representation of the png image.
+    extent : tuple
+        The (left, right, bottom, top) extent of the image in data
+        coordinates.
+    """
+    from matplotlib.backends.backend_agg import RendererAgg
+    from matplotlib.image import imsave
+
+    fig = ax.figure
+    width, height = fig.bbox.size
+    renderer = RendererAgg(width, height, fig.dpi)
+    artist.draw(renderer)
+    pixels = np.asarray(renderer.buffer_rgba())
+
+    # Crop to the pixels covered by the axes.  Rows are counted from the
+    # top, at display height renderer.height.
+    x0, y0, x1, y1 = ax.bbox.extents
+    col0 = max(int(np.floor(x0)), 0)
+    col1 = min(int(np.ceil(x1)), pixels.shape[1])
+    row0 = max(int(np.floor(renderer.height - y1)), 0)
+    row1 = min(int(np.ceil(renderer.height - y0)), pixels.shape[0])
+    pixels = pixels[row0:row1, col0:col1]
+
+    (left, bottom), (right, top) = ax.transData.inverted().transform(
+        [(col0, renderer.height - row1), (col1, renderer.height - row0)])
+
+    binary_buffer = io.BytesIO()
+    imsave(binary_buffer, pixels, format='png')
+    binary_buffer.seek(0)
+    imdata = base64.b64encode(binary_buffer.read()).decode('utf-8')
+    return imdata, (left, right, bottom, top)
@@ -34,5 +34,6 @@ setup(name=NAME,
       url=URL,
       download_url=DOWNLOAD_URL,
       license=LICENSE,
-      packages=['mplexporter', 'mplexporter.renderers'],
+      packages=['mplexporter', 'mplexporter.renderers',
+                'mplexporter.benchmarks'],
      )